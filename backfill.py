@@ -0,0 +1,211 @@
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import db
+from db import DBManager
+from fetch import Fetcher, HLTV_URL
+from main import Scraper, Tracker
+from models import Match, BackfillPage, MATCH_FIELDS
+from parsers import make_parser
+from utils import get_credentials
+
+log = logging.getLogger(__name__)
+
+# Results HLTV lists per page, used until the first page says otherwise.
+RESULTS_PAGE_SIZE = 100
+
+regex_pagination = re.compile(r"([0-9,]+)\s*-\s*([0-9,]+)\s+of\s+([0-9,]+)")
+
+
+def results_url(eventid, offset=0):
+    if offset:
+        return f"{HLTV_URL}/results?offset={offset}&event={eventid}"
+
+    return f"{HLTV_URL}/results?event={eventid}"
+
+
+def parse_pagination(soup):
+    """Returns (page_size, total) from the "1 - 100 of 1234" label, or None."""
+    label = soup.find("span", {"class": "pagination-data"})
+
+    if label is None:
+        return None
+
+    found = re.search(regex_pagination, label.text)
+    if found is None:
+        return None
+
+    first, last, total = (int(group.replace(",", "")) for group in found.groups())
+
+    return last - first + 1, total
+
+
+class Backfill:
+    """Stores every results page of an event, not only the first one.
+
+    Pages are fetched `concurrency` at a time and each one is written together
+    with its BackfillPage checkpoint, so an interrupted run picks up the pages
+    it has not stored yet. Results are listed newest first: when the event
+    gained results since a checkpoint, its rows have moved down by the same
+    amount and are matched up again before deciding what is left to fetch.
+    """
+
+    def __init__(self, eventid, dbmanager, fetcher=None, parser=None, concurrency=4):
+        if fetcher is None:
+            fetcher = Fetcher(max_workers=concurrency)
+
+        self.eventid = eventid
+        self.dbmanager = dbmanager
+        self.engine = dbmanager.engine
+        self.fetcher = fetcher
+        self.concurrency = concurrency
+
+        # Only used for its results extraction.
+        self.scraper = Scraper(eventid, fetcher=fetcher, parser=parser or make_parser())
+
+        self.page_size = RESULTS_PAGE_SIZE
+        self.total = None
+
+        self.pages = 0
+        self.matches = 0
+        self.failed = []
+
+    def checkpoints(self):
+        session = self.dbmanager.create_session(expire_on_commit=False)
+
+        try:
+            return session.query(BackfillPage).all()
+
+        finally:
+            session.close()
+
+    def reset(self):
+        with self.engine.begin() as connection:
+            connection.execute(BackfillPage.__table__.delete())
+
+        log.info(f"[{self.eventid}] Cleared backfill checkpoints")
+
+    def fetch_page(self, offset):
+        """Runs on a worker thread: fetches and parses one results page."""
+        response = self.fetcher.get(results_url(self.eventid, offset))
+
+        if response.status_code != 200:
+            raise IOError(f"HTTP {response.status_code} for results offset {offset}")
+
+        soup = self.scraper.parser.parse(response.content, "results")
+
+        return self.scraper.parse_results(soup), parse_pagination(soup)
+
+    def store(self, offset, records):
+        matches = [record._asdict() for record in records]
+
+        checkpoint = BackfillPage(offset=offset, total=self.total, matches=len(records), unix_ts=int(time.time()))
+
+        with self.engine.begin() as connection:
+            # Flags are set by hand on the sheet side and never overwritten.
+            db.bulk_upsert(connection, Match, matches, ["id"], [field for field in MATCH_FIELDS if field != "flags"])
+            db.bulk_upsert(connection, BackfillPage, [db.row_values(checkpoint)], ["offset"], ["total", "matches", "unix_ts"])
+
+        self.pages += 1
+        self.matches += len(records)
+
+        log.info(f"[{self.eventid}] Stored results offset {offset} ({len(records)} matches)")
+
+    def pending(self, checkpoints):
+        """Offsets of the pages not fully covered by earlier checkpoints."""
+        covered = set()
+        for checkpoint in checkpoints:
+            shift = self.total - (checkpoint.total or self.total)
+            start = checkpoint.offset + shift
+
+            covered.update(range(start, start + checkpoint.matches))
+
+        return [
+            offset for offset in range(0, self.total, self.page_size)
+            if not all(row in covered for row in range(offset, min(offset + self.page_size, self.total)))
+        ]
+
+    def run(self):
+        """Backfills every missing page. Returns the number of pages stored."""
+        # The first page is always fetched again, it tells the current total.
+        records, pagination = self.fetch_page(0)
+
+        if pagination is not None:
+            self.page_size, self.total = pagination
+        else:
+            self.total = len(records)
+
+        offsets = [offset for offset in self.pending(self.checkpoints()) if offset != 0]
+        self.store(0, records)
+
+        log.info(f"[{self.eventid}] {self.total} results, {len(offsets)} more pages to fetch")
+
+        offsets.reverse()
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="backfill") as executor:
+            while offsets or running:
+                while offsets and len(running) < self.concurrency:
+                    offset = offsets.pop()
+                    running[executor.submit(self.fetch_page, offset)] = offset
+
+                done, _ = wait(running.keys(), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    offset = running.pop(future)
+
+                    try:
+                        records, _ = future.result()
+
+                    except Exception as err:
+                        log.error(f"[{self.eventid}] Results offset {offset} failed: {err}")
+                        self.failed.append(offset)
+                        continue
+
+                    self.store(offset, records)
+
+        if self.failed:
+            log.warning(f"[{self.eventid}] {len(self.failed)} pages failed, run the backfill again to resume")
+
+        return self.pages
+
+
+def publish(tracker):
+    """Reconciles the worksheet with every match in the database, oldest first."""
+    session = tracker.dbmanager.create_session(expire_on_commit=False)
+
+    try:
+        tracker.database.update_session(session)
+        tracker.database.get_matches(tracker.scraper)
+
+        matches = dict(sorted(tracker.scraper.matches.items(), key=lambda item: (item[1].unix_ts or 0, item[0])))
+
+        tracker.ssmanager.refresh()
+        tracker.ssmanager.update_matches(matches)
+        tracker.ssmanager.append_matches(matches)
+
+    finally:
+        session.close()
+
+
+def main(args):
+    dbmanager = DBManager(args.eventid)
+    db.bootstrap(dbmanager.engine)
+
+    backfill = Backfill(
+        args.eventid, dbmanager,
+        parser=make_parser(args.parser),
+        concurrency=args.concurrency
+    )
+
+    if args.restart:
+        backfill.reset()
+
+    backfill.run()
+
+    log.info(f"[{args.eventid}] Backfill stored {backfill.pages} pages, {backfill.matches} matches")
+
+    if args.sskey is not None:
+        tracker = Tracker(args.eventid, args.sskey, credentials=get_credentials(args))
+        publish(tracker)
@@ -0,0 +1,214 @@
+"""Per-phase latency and throughput of one update cycle, fully offline.
+
+HLTV is served from benchmarks/fixtures.py (or recorded pages), Google
+from fakes.FakeClient, and every round gets a fresh event database in a
+temporary directory. Run from the repository root:
+    python -m benchmarks.bench_cycle -s small medium large -r 5
+    python -m benchmarks.bench_cycle --fixtures saved/ -r 5
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+import db
+import exceptions
+import fakes
+from benchmarks import fixtures
+from main import Tracker
+from parsepool import ParsePool
+from parsers import make_parser
+from writequeue import TokenBucket
+
+# Items are page bytes for update, rows or cells for everything else.
+PHASES = (
+    "update", "get_teams", "get_results", "get_matches", "persist",
+    "refresh", "append_matches", "update_matches", "update_unchanged"
+)
+
+
+class Timings:
+    def __init__(self):
+        self.samples = {}  # phase -> [(seconds, items)]
+
+    @contextmanager
+    def phase(self, name, items=0):
+        # The caller may fill in the item count once the phase has run.
+        sample = {"items": items}
+
+        start = time.perf_counter()
+        yield sample
+        self.samples.setdefault(name, []).append((time.perf_counter() - start, sample["items"]))
+
+    def summary(self):
+        summary = {}
+        for name in PHASES:
+            if name not in self.samples:
+                continue
+
+            seconds = [sample[0] for sample in self.samples[name]]
+            items = self.samples[name][-1][1]
+            median = statistics.median(seconds)
+
+            summary[name] = {
+                "median_ms": median * 1000,
+                "min_ms": min(seconds) * 1000,
+                "items": items,
+                "items_per_s": items / median if median > 0 and items else None
+            }
+
+        return summary
+
+
+def run_round(eventid, pages, parser_backend, timings, pool=None):
+    fetcher = fakes.FakeFetcher(fixtures.urls(eventid, pages))
+    client = fakes.FakeClient()
+
+    # Unlimited quota: the benchmark measures our side, not the pacing.
+    tracker = Tracker(
+        eventid, f"bench-{eventid}",
+        client=client, fetcher=fetcher, parser=make_parser(parser_backend),
+        bucket=TokenBucket(rate=10 ** 9, capacity=10 ** 9),
+        pool=pool
+    )
+    scraper = tracker.scraper
+
+    session = tracker.dbmanager.create_session(expire_on_commit=False)
+    try:
+        tracker.database.update_session(session)
+
+        with timings.phase("update", items=sum(len(content) for content in pages.values())):
+            scraper.update(session)
+
+        with timings.phase("get_teams") as sample:
+            scraper.get_teams()
+            sample["items"] = len(scraper.teams)
+
+        before = len(scraper.matches)
+        with timings.phase("get_results") as sample:
+            scraper.get_results()
+            sample["items"] = len(scraper.matches) - before
+
+        before = len(scraper.matches)
+        with timings.phase("get_matches") as sample:
+            try:
+                scraper.get_matches()
+            except exceptions.NoMatchesFound:
+                pass
+
+            sample["items"] = len(scraper.matches) - before
+
+        changes = scraper.changes
+        matches = [scraper.matches[match_id] for match_id in changes.match_ids()]
+
+        with timings.phase("persist", items=len(matches) + len(changes.teams) + len(changes.definitions)):
+            db.persist(
+                tracker.dbmanager.engine,
+                matches=matches,
+                teams=[scraper.teams[team_id] for team_id in changes.teams],
+                definitions=[scraper.definitions[team_id] for team_id in changes.definitions]
+            )
+            tracker.database.acknowledge_writes()
+
+        with timings.phase("refresh"):
+            tracker.ssmanager.refresh()
+
+        with timings.phase("append_matches", items=len(scraper.matches)):
+            tracker.ssmanager.append_matches(scraper.matches)
+
+        # Every finished match gets a new score, the rest stays as it is.
+        finished = [match for match in scraper.matches.values() if match.state == -1]
+        for match in finished:
+            match.set(teamscore2=match.teamscore2 + 1)
+
+        with timings.phase("update_matches", items=len(finished)):
+            tracker.ssmanager.update_matches(scraper.matches)
+
+        scraper.release()
+
+        with timings.phase("update_unchanged"):
+            scraper.update(session)
+
+    finally:
+        scraper.release()
+        session.close()
+        tracker.dbmanager.engine.dispose()
+        fetcher.close()
+
+
+def bench(make_pages, eventids, parser_backend, pool=None):
+    timings = Timings()
+
+    # A new event id per round means a new, empty database.
+    for eventid in eventids:
+        run_round(eventid, make_pages(eventid), parser_backend, timings, pool)
+
+    return timings.summary()
+
+
+def report(name, summary):
+    print(f"\n{name}")
+    print(f"{'phase':<18} {'median ms':>10} {'min ms':>10} {'items':>9} {'items/s':>12}")
+
+    for phase, row in summary.items():
+        rate = f"{row['items_per_s']:>12.0f}" if row["items_per_s"] is not None else f"{'-':>12}"
+        print(f"{phase:<18} {row['median_ms']:>10.2f} {row['min_ms']:>10.2f} {row['items']:>9} {rate}")
+
+    total = sum(row["median_ms"] for phase, row in summary.items() if phase != "update_unchanged")
+    print(f"{'cycle':<18} {total:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', "--sizes", nargs="+", choices=list(fixtures.SIZES), default=list(fixtures.SIZES))
+    parser.add_argument('-r', "--rounds", type=int, default=5)
+    parser.add_argument('-p', "--parser", choices=['lxml', 'html.parser'], default=None)
+    parser.add_argument("--parsepool", action="store_true", help="Parse in worker processes, as run.py --parsepool does")
+    parser.add_argument("--fixtures", help="Directory with recorded matches.html, results.html and teams.html")
+    parser.add_argument("--save", help="Write the generated fixtures of each size to this directory")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object instead of tables")
+    args = parser.parse_args()
+
+    if args.fixtures is not None:
+        recorded = fixtures.load(args.fixtures)
+        cases = {os.path.basename(os.path.normpath(args.fixtures)): lambda eventid: recorded}
+    else:
+        cases = {size: (lambda eventid, size=size: fixtures.generate(eventid, size)) for size in args.sizes}
+
+    if args.save is not None:
+        for size in args.sizes:
+            fixtures.save(os.path.join(args.save, size), fixtures.generate(1, size))
+
+    pool = ParsePool() if args.parsepool else None
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # DBManager keeps its databases under ./database
+        os.makedirs(os.path.join(directory, "database"))
+        os.chdir(directory)
+
+        try:
+            for index, (name, make_pages) in enumerate(cases.items()):
+                eventids = range(index * args.rounds + 1, (index + 1) * args.rounds + 1)
+                results[name] = bench(make_pages, eventids, args.parser, pool)
+
+        finally:
+            os.chdir(cwd)
+
+            if pool is not None:
+                pool.close()
+
+    if args.json:
+        print(json.dumps(results, sort_keys=True))
+        return
+
+    for name, summary in results.items():
+        report(name, summary)
+
+
+if __name__ == "__main__":
+    main()
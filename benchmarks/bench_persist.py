@@ -0,0 +1,94 @@
+"""Rows per second for the ORM unit-of-work path versus db.persist.
+
+Run from the repository root:
+    python -m benchmarks.bench_persist -n 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+import db
+from models import Match
+
+
+def make_matches(count):
+    return [
+        Match(
+            id=100000 + i, unix_ts=1500000000 + i * 60, state=-1,
+            teamname1=f"Team {i % 64}", teamname2=f"Team {(i + 1) % 64}",
+            teamscore1=16, teamscore2=i % 15, map="inferno"
+        )
+        for i in range(count)
+    ]
+
+
+def open_engine(directory, name):
+    engine = db.connect(os.path.join(directory, f"{name}.db"))
+    db.bootstrap(engine)
+
+    return engine
+
+
+def bench_orm(engine, count):
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    session = Session()
+    matches = make_matches(count)
+
+    start = time.perf_counter()
+    for match in matches:
+        session.add(match)
+    session.flush()
+    session.commit()
+    inserted = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for match in matches:
+        match.set(teamscore2=(match.teamscore2 + 1) % 15)
+    session.flush()
+    session.commit()
+    updated = time.perf_counter() - start
+
+    session.close()
+
+    return inserted, updated
+
+
+def bench_bulk(engine, count):
+    matches = make_matches(count)
+
+    start = time.perf_counter()
+    db.persist(engine, matches=matches)
+    inserted = time.perf_counter() - start
+
+    for match in matches:
+        match.set(teamscore2=(match.teamscore2 + 1) % 15)
+
+    start = time.perf_counter()
+    db.persist(engine, matches=matches)
+    updated = time.perf_counter() - start
+
+    return inserted, updated
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-n', "--rows", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            "orm": bench_orm(open_engine(directory, "orm"), args.rows),
+            "bulk": bench_bulk(open_engine(directory, "bulk"), args.rows)
+        }
+
+    print(f"{'path':<6} {'insert rows/s':>14} {'update rows/s':>14}")
+    for name, (inserted, updated) in results.items():
+        print(f"{name:<6} {args.rows / inserted:>14.0f} {args.rows / updated:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""HLTV-shaped matches, results and team pages for offline runs.
+
+Only the markup Scraper.get_* reads is reproduced, wrapped in roughly the
+amount of navigation, scripts and sidebar a real page carries so parse
+times stay realistic. Recorded pages can be used instead by saving them as
+matches.html, results.html and teams.html in one directory.
+"""
+import os
+import re
+import time
+
+from fetch import HLTV_URL
+
+# (teams, upcoming, live, results) per event size. HLTV lists at most 100
+# results on one page.
+SIZES = {
+    "small": (16, 8, 2, 24),         # group stage
+    "medium": (32, 32, 4, 100),      # main event
+    "large": (512, 256, 16, 100)     # open qualifier
+}
+
+MAPS = ("inferno", "mirage", "nuke", "ancient", "anubis", "vertigo", "dust2")
+
+regex_teams_link = re.compile(rb'class="event-nav inactive" href="([^"]+)"')
+
+
+def filler(kilobytes):
+    block = '<div class="newsline"><a href="/news/1/x"><span class="newstext">Lorem ipsum dolor sit amet</span></a></div>'
+    script = '<script type="text/javascript">window.__data = {"key": "value", "list": [1, 2, 3]};</script>'
+
+    return (block + script) * (kilobytes * 1024 // (len(block) + len(script)))
+
+
+def page(eventid, body):
+    return (
+        f'<!DOCTYPE html><html><head><title>Event {eventid}</title>{filler(40)}</head><body>'
+        f'<div class="navbar">{filler(20)}</div>'
+        f'<div class="contentCol">{body}</div>'
+        f'<aside class="sidebar">{filler(60)}</aside>'
+        f'</body></html>'
+    ).encode()
+
+
+def team_name(index):
+    return f"Team {index:03d}"
+
+
+def matches_page(eventid, teams, upcoming, live, now=None):
+    if now is None:
+        now = int(time.time())
+
+    live_matches = "".join(
+        f'<div class="live-match"><a href="/matches/{eventid * 10000 + i}/live" class="match a-reset">'
+        f'<table class="table" data-livescore-match="{eventid * 10000 + i}">'
+        f'<tr class="header"><td class="bestof">Best of 1</td><td class="map">{MAPS[i % len(MAPS)].title()}</td></tr>'
+        f'<tr><td><span class="team-name">{team_name(2 * i % teams)}</span></td><td class="livescore"><span>{i % 16}</span></td><td class="total"><span>0</span></td></tr>'
+        f'<tr><td><span class="team-name">{team_name((2 * i + 1) % teams)}</span></td><td class="livescore"><span>{(i + 5) % 16}</span></td><td class="total"><span>0</span></td></tr>'
+        f'</table></a></div>'
+        for i in range(live)
+    )
+
+    upcoming_matches = "".join(
+        f'<a href="/matches/{eventid * 10000 + 1000 + i}/upcoming" class="upcoming-match" data-zonedgrouping-entry-unix="{(now + 3600 + i * 600) * 1000}">'
+        f'<table class="table"><tr>'
+        f'<td class="time"><div class="time">12:00</div></td>'
+        f'<td class="team-cell"><div class="team">{team_name(i % teams)}</div></td>'
+        f'<td class="vs">vs</td>'
+        f'<td class="team-cell"><div class="team">{team_name((i + 7) % teams)}</div></td>'
+        f'<td class="star-cell"><div class="map-text">bo1</div></td>'
+        f'</tr></table></a>'
+        for i in range(upcoming)
+    )
+
+    return page(eventid, (
+        f'<div class="event-hub"><a class="event-nav inactive" href="/events/{eventid}/teams">Teams</a></div>'
+        f'<div class="live-matches">{live_matches}</div>'
+        f'<div class="upcoming-matches">'
+        f'<div data-zonedgrouping-headline-classes="standard-headline">'
+        f'<div class="match-day"><span class="standard-headline">Today</span>{upcoming_matches}</div>'
+        f'</div></div>'
+    ))
+
+
+def results_page(eventid, teams, results, now=None):
+    if now is None:
+        now = int(time.time())
+
+    entries = "".join(
+        f'<div class="result-con"><a href="/matches/{eventid * 10000 + 5000 + i}/result" class="a-reset">'
+        f'<div class="result"><table><tr>'
+        f'<td class="team-cell"><div class="line-align team1"><div class="team">{team_name(i % teams)}</div></div></td>'
+        f'<td class="result-score"><span class="score-won">16</span> - <span class="score-lost">{i % 15}</span></td>'
+        f'<td class="team-cell"><div class="line-align team2"><div class="team">{team_name((i + 3) % teams)}</div></div></td>'
+        f'<td class="event"><span class="event-name">Event {eventid}</span></td>'
+        f'<td class="star-cell"><div class="map-text">{MAPS[i % len(MAPS)]}</div></td>'
+        f'<td class="date-cell"><span data-unix="{(now - 3600 - i * 600) * 1000}">today</span></td>'
+        f'</tr></table></div></a></div>'
+        for i in range(results)
+    )
+
+    return page(eventid, (
+        f'<div class="pagination-component"><span class="pagination-data">1 - {results} of {results}</span></div>'
+        f'<div class="results-all"><div class="results-sublist">{entries}</div></div>'
+    ))
+
+
+def teams_page(eventid, teams):
+    rows = "".join(
+        f'<tr class="team-row"><td><a href="/team/{eventid * 1000 + i}/team-{i}">{team_name(i)}</a></td><td>0-0</td></tr>'
+        for i in range(teams)
+    )
+
+    return page(eventid, f'<div class="groups-container"><table class="table"><tr><th>Team</th><th>W-L</th></tr>{rows}</table></div>')
+
+
+def generate(eventid, size):
+    """Returns {"matches": bytes, "results": bytes, "teams": bytes} for one of SIZES."""
+    teams, upcoming, live, results = SIZES[size]
+
+    return {
+        "matches": matches_page(eventid, teams, upcoming, live),
+        "results": results_page(eventid, teams, results),
+        "teams": teams_page(eventid, teams)
+    }
+
+
+def load(directory):
+    fixtures = {}
+    for name in ("matches", "results", "teams"):
+        with open(os.path.join(directory, f"{name}.html"), "rb") as f:
+            fixtures[name] = f.read()
+
+    return fixtures
+
+
+def save(directory, fixtures):
+    os.makedirs(directory, exist_ok=True)
+
+    for name, content in fixtures.items():
+        with open(os.path.join(directory, f"{name}.html"), "wb") as f:
+            f.write(content)
+
+
+def urls(eventid, fixtures):
+    """Maps the URLs Scraper.update requests for `eventid` to the fixture pages."""
+    teams_link = re.search(regex_teams_link, fixtures["matches"])
+
+    return {
+        f"{HLTV_URL}/matches?event={eventid}": fixtures["matches"],
+        f"{HLTV_URL}/results?event={eventid}": fixtures["results"],
+        HLTV_URL + teams_link.group(1).decode(): fixtures["teams"]
+    }
@@ -0,0 +1,233 @@
+"""capture.py.
+
+Records every page Scraper.update receives into a compressed, append-only
+archive, and replays such an archive through a Tracker with no network,
+no Google and no waiting between cycles.
+
+Each record is its own gzip member holding a JSON header line followed by
+the raw body, so the file can be appended to by several trackers and a
+record cut short by a crash only loses itself.
+"""
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from fetch import Fetcher
+from writequeue import TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+class Record:
+    def __init__(self, event, update, resource, url, status, fetched_at, content=b""):
+        self.event = event
+        self.update = update        # Scraper.updates when the page was fetched
+        self.resource = resource    # "upcoming", "results" or "teams"
+        self.url = url
+        self.status = status
+        self.fetched_at = fetched_at
+        self.content = content
+
+    def __repr__(self):
+        return f"Record(event: {self.event}, update: {self.update}) {self.resource} [{self.status}, {len(self.content)} bytes]"
+
+    def header(self):
+        return {
+            "event": self.event, "update": self.update, "resource": self.resource, "url": self.url,
+            "status": self.status, "fetched_at": self.fetched_at, "length": len(self.content)
+        }
+
+
+class Archive:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+        self.written = 0
+
+    def write(self, record):
+        data = json.dumps(record.header()).encode() + b"\n" + record.content
+
+        with self.lock:
+            with open(self.path, "ab") as f:
+                f.write(gzip.compress(data))
+
+            self.written += 1
+
+    def record(self, event, update, resource, page):
+        self.write(Record(event, update, resource, page.url, page.status_code, page.fetched_at, page.content))
+
+    def __iter__(self):
+        return read(self.path)
+
+
+def read(path):
+    """Yields the records of an archive in the order they were written."""
+    with gzip.open(path, "rb") as f:
+        while True:
+            try:
+                line = f.readline()
+                if not line:
+                    return
+
+                header = json.loads(line)
+                content = f.read(header.pop("length"))
+
+            except (EOFError, gzip.BadGzipFile, ValueError) as err:
+                log.warning(f"Archive {path} ends with an incomplete record: {err}")
+                return
+
+            yield Record(content=content, **header)
+
+
+def group(records, eventid=None):
+    """{event: [(update, {resource: Record})]} in update order."""
+    events = {}
+    for record in records:
+        if eventid is not None and record.event != eventid:
+            continue
+
+        updates = events.setdefault(record.event, {})
+        updates.setdefault(record.update, {})[record.resource] = record
+
+    return {event: sorted(updates.items()) for event, updates in events.items()}
+
+
+class RecordedResponse:
+    """What Fetcher.fetch reads of a response. Headers were not recorded."""
+
+    def __init__(self, content, status_code):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {}
+
+
+class ReplayFetcher(Fetcher):
+    """Answers each URL with the recorded status and body of the current update."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+
+        self.pages = {}  # url -> Record
+        self.requests = []
+
+    def serve(self, records):
+        self.pages = {record.url: record for record in records}
+
+    def get(self, url, **options):
+        self.requests.append(url)
+
+        record = self.pages.get(url)
+        if record is None:
+            return RecordedResponse(b"", 404)
+
+        return RecordedResponse(record.content, record.status)
+
+
+class Replay:
+    """Runs one Tracker cycle per recorded update of an event.
+
+    Every resource gets an infinite TTL and only the ones fetched in the
+    recorded update are invalidated, so the replayed scraper requests
+    exactly the pages the original one did, whatever time it is now.
+    """
+
+    def __init__(self, eventid, updates, parser=None, sskey="replay"):
+        import fakes
+        from main import Tracker, RESOURCE_TTLS
+
+        self.eventid = eventid
+        self.updates = updates
+
+        self.fetcher = ReplayFetcher()
+        self.client = fakes.FakeClient()
+
+        self.tracker = Tracker(
+            eventid, sskey,
+            client=self.client, fetcher=self.fetcher, parser=parser,
+            bucket=TokenBucket(rate=10 ** 9, capacity=10 ** 9),
+            ttls={name: float("inf") for name in RESOURCE_TTLS}
+        )
+
+        self.cycles = 0
+        self.failures = []  # updates that raised
+
+    def step(self, resources):
+        recorded_at = min(record.fetched_at for record in resources.values())
+
+        # Refreshes the scraper asked for on demand are already in the
+        # recording, as part of whichever update actually made them.
+        for name, resource in self.tracker.scraper.resources.items():
+            if name in resources:
+                resource.invalidate()
+            else:
+                resource.fetched_at = recorded_at
+
+        self.fetcher.serve(resources.values())
+        self.tracker.cycle()
+
+        self.cycles += 1
+
+    def run(self):
+        for update, resources in self.updates:
+            log.debug(f"[{self.eventid}] Replaying update {update}: {', '.join(resources)}")
+
+            try:
+                self.step(resources)
+
+            except Exception:
+                log.exception(f"[{self.eventid}] Replayed update {update} failed")
+                self.failures.append(update)
+
+        return self.tracker
+
+    def close(self):
+        self.fetcher.close()
+        self.tracker.dbmanager.engine.dispose()
+
+
+def replay(path, eventid=None, parser=None):
+    """Replays an archive in the current directory. Returns {eventid: Replay}."""
+    replays = {}
+
+    for event, updates in group(read(path), eventid).items():
+        start = time.perf_counter()
+
+        replays[event] = Replay(event, updates, parser=parser)
+        replays[event].run()
+
+        log.info(f"[{event}] Replayed {len(updates)} updates in {time.perf_counter() - start:.2f}s")
+
+    return replays
+
+
+def main(args):
+    from parsers import make_parser
+
+    path = os.path.abspath(args.archive)
+    directory = args.directory
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as temporary:
+        if directory is None:
+            directory = temporary
+
+        # DBManager keeps its databases under ./database
+        os.makedirs(os.path.join(directory, "database"), exist_ok=True)
+        os.chdir(directory)
+
+        try:
+            replays = replay(path, eventid=args.eventid, parser=make_parser(args.parser))
+
+            for event, result in replays.items():
+                worksheet = result.client.open_by_key("replay").get_worksheet(0)
+                log.info(f"[{event}] {result.cycles} cycles, {len(result.failures)} failed, {len(result.tracker.scraper.matches)} matches, {worksheet.last_row() - 1} sheet rows")
+
+                result.close()
+
+        finally:
+            os.chdir(cwd)
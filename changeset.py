@@ -0,0 +1,50 @@
+class Changeset:
+    """What one scrape cycle changed: new matches, changed match fields, state
+    transitions, and touched teams/definitions."""
+
+    def __init__(self):
+        self.new = set()          # match ids
+        self.changed = {}         # match id -> set of field names
+        self.transitions = {}     # match id -> (old state, new state)
+
+        self.teams = set()        # team ids
+        self.definitions = set()  # team ids of team definitions
+
+        # (block kind, match id) -> digest; on their own they are not worth a
+        # write and go out with the next real change.
+        self.fingerprints = {}
+
+    def __bool__(self):
+        return bool(self.new or self.changed or self.teams or self.definitions)
+
+    def __repr__(self):
+        return (f"Changeset(new: {len(self.new)}, changed: {len(self.changed)}, "
+                f"transitions: {len(self.transitions)}, teams: {len(self.teams)}, definitions: {len(self.definitions)})")
+
+    def add_match(self, match_id):
+        self.new.add(match_id)
+
+    def change_match(self, match_id, fields, old_state=None, new_state=None):
+        if match_id in self.new:
+            return
+
+        self.changed.setdefault(match_id, set()).update(fields)
+
+        if old_state != new_state:
+            first_state = self.transitions.get(match_id, (old_state, None))[0]
+            self.transitions[match_id] = (first_state, new_state)
+
+    def match_ids(self):
+        return self.new | set(self.changed.keys())
+
+    def merge(self, other):
+        for match_id in other.new:
+            self.add_match(match_id)
+
+        for match_id, fields in other.changed.items():
+            old_state, new_state = other.transitions.get(match_id, (None, None))
+            self.change_match(match_id, fields, old_state, new_state)
+
+        self.teams |= other.teams
+        self.definitions |= other.definitions
+        self.fingerprints.update(other.fingerprints)
@@ -0,0 +1,140 @@
+import heapq
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import gspread
+
+import metrics
+from capture import Archive
+from fetch import Fetcher
+from main import Tracker
+from parsepool import ParsePool
+from ratings import load_ratings
+from parsers import make_parser
+from scheduler import PollScheduler
+from utils import get_credentials
+from writequeue import TokenBucket
+
+log = logging.getLogger(__name__)
+
+
+class Job:
+    def __init__(self, eventid, sskey, worksheet=0):
+        self.eventid = int(eventid)
+        self.sskey = sskey
+        self.worksheet = int(worksheet)
+
+    def __repr__(self):
+        return f"Job(eventid: {self.eventid}) {self.sskey}[{self.worksheet}]"
+
+
+def load_jobs(filename):
+    """Reads a JSON list of {"eventid": ..., "sskey": ..., "worksheet": ...} objects."""
+    with open(filename, "r") as f:
+        entries = json.load(f)
+
+    return [Job(**entry) for entry in entries]
+
+
+class Daemon:
+    """Tracks several events in one process.
+
+    Every event keeps its own Scraper, Database and Sheets state through a
+    Tracker, while the HTTP pool, the Google client and, if any, the parse
+    pool and team ratings are shared. Cycles are run on a bounded worker
+    pool whenever an event's scheduler says it is due.
+    """
+
+    def __init__(self, jobs, workers=4, credentials=None, client=None, fetcher=None, numdaysadvance=1, parser_backend=None, poll_options=None, ttls=None, metrics_summary=False, archive=None, pool=None, ratings=None):
+        self.workers = workers
+
+        if client is None:
+            client = gspread.authorize(credentials)
+
+        if fetcher is None:
+            fetcher = Fetcher(max_workers=2 * workers)
+
+        self.client = client
+        self.fetcher = fetcher
+        self.bucket = TokenBucket()
+
+        self.trackers = []
+        for job in jobs:
+            log.info(f"Starting tracker for {job}")
+
+            self.trackers.append(Tracker(
+                job.eventid, job.sskey,
+                worksheet=job.worksheet,
+                numdaysadvance=numdaysadvance,
+                client=self.client,
+                bucket=self.bucket,
+                fetcher=self.fetcher,
+                parser=make_parser(parser_backend),
+                scheduler=PollScheduler(**(poll_options or {})),
+                ttls=ttls,
+                metrics_summary=metrics_summary,
+                archive=archive,
+                pool=pool,
+                ratings=ratings
+            ))
+
+    def run_cycle(self, tracker):
+        try:
+            return tracker.cycle()
+
+        except Exception:
+            log.exception(f"[{tracker.eventid}] Unhandled exception during update")
+            metrics.ERRORS.inc(event=tracker.eventid, source="unhandled")
+
+            return tracker.scheduler.floor
+
+    def run(self, stop=None):
+        """Runs until `stop` (a threading.Event) is set, or forever."""
+        due = [(time.time(), index) for index in range(len(self.trackers))]
+        heapq.heapify(due)
+
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tracker") as executor:
+            while stop is None or not stop.is_set():
+                now = time.time()
+
+                while due and due[0][0] <= now:
+                    _, index = heapq.heappop(due)
+                    running[executor.submit(self.run_cycle, self.trackers[index])] = index
+
+                timeout = max(due[0][0] - now, 0) if due else None
+
+                if running:
+                    done, _ = wait(running.keys(), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        index = running.pop(future)
+                        heapq.heappush(due, (time.time() + future.result(), index))
+
+                elif timeout is not None:
+                    time.sleep(timeout)
+
+                else:
+                    break
+
+
+def main(args):
+    g_credentials = get_credentials(args)
+
+    daemon = Daemon(
+        load_jobs(args.jobs),
+        workers=args.workers,
+        credentials=g_credentials,
+        numdaysadvance=args.numdaysadvance,
+        parser_backend=args.parser,
+        poll_options={"floor": args.pollfloor, "ceiling": args.pollceiling, "live": args.polllive},
+        ttls={"results": args.resultsttl, "teams": args.teamsttl},
+        metrics_summary=args.metricsjson,
+        archive=Archive(args.capture) if args.capture else None,
+        pool=ParsePool() if args.parsepool else None,
+        ratings=load_ratings(by_map=args.ratingmaps) if args.ratings else None
+    )
+
+    daemon.run()
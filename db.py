@@ -1,7 +1,8 @@
 import logging
 import sys
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -9,9 +10,38 @@ Base = declarative_base()
 
 log = logging.getLogger(__name__)
 
+# Applied to every new SQLite connection. WAL lets readers and the writer run
+# side by side and, with synchronous=NORMAL, a commit no longer waits on an
+# fsync of the database file (a crash may lose the last commits, never corrupt).
+SQLITE_PRAGMAS = (
+	("journal_mode", "WAL"),
+	("synchronous", "NORMAL"),
+	("cache_size", -16000),  # KiB
+	("temp_store", "MEMORY"),
+	("busy_timeout", 5000)   # ms
+)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+	cursor = dbapi_connection.cursor()
+	try:
+		for name, value in SQLITE_PRAGMAS:
+			cursor.execute(f"PRAGMA {name}={value}")
+	finally:
+		cursor.close()
+
+
+def connect(path):
+	# Trackers run their cycles on worker threads, so connections must be
+	# usable from whichever thread picks the session up next.
+	engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+	event.listen(engine, "connect", set_sqlite_pragmas)
+
+	return engine
+
 
 def create_tables(engine):
-	from models import Match, Definition, Team
+	from models import Match, Definition, Team, BackfillPage, Fingerprint
 
 	try:
 		Base.metadata.create_all(engine)
@@ -19,29 +49,137 @@ def create_tables(engine):
 		log.exception(f"Exception caught in db.create_tables: {e}")
 		sys.exit(1)
 
+	dedupe_definitions(engine)
+
+	# create_all only adds indexes together with a new table, so databases
+	# from older versions get theirs here.
+	for table in Base.metadata.sorted_tables:
+		for index in table.indexes:
+			try:
+				index.create(engine, checkfirst=True)
+			except Exception as e:
+				if index.unique:
+					# persist upserts against it, every write would fail.
+					log.critical(f"Could not create unique index {index.name} on {table.name}, fix the table by hand: {e}")
+					sys.exit(1)
+
+				log.error(f"Could not create index {index.name}: {e}")
+
+
+def dedupe_definitions(engine):
+	"""Drops all but the oldest definition of each team. Databases from before
+	the unique (DEF_TYPE, TEAM_ID) index may hold several."""
+	with engine.begin() as connection:
+		deleted = connection.execute(text(
+			"DELETE FROM definitions WHERE TEAM_ID IS NOT NULL AND DEF_ID NOT IN ("
+			"SELECT MIN(DEF_ID) FROM definitions WHERE TEAM_ID IS NOT NULL GROUP BY DEF_TYPE, TEAM_ID)"
+		)).rowcount
+
+	if deleted:
+		# The oldest row is the one definition lookups have always returned.
+		log.warning(f"Removed {deleted} duplicate team definitions from {engine.url.database}")
+
+	return deleted
+
+
+def check_database(engine):
+	"""Startup sanity check. Returns False if SQLite reports corruption."""
+	with engine.connect() as connection:
+		integrity = [row[0] for row in connection.execute(text("PRAGMA quick_check"))]
+		journal_mode = connection.execute(text("PRAGMA journal_mode")).scalar()
+		synchronous = connection.execute(text("PRAGMA synchronous")).scalar()
+
+	if integrity != ["ok"]:
+		log.error(f"SQLite quick_check failed for {engine.url.database}: {integrity[:10]}")
+		return False
+
+	if journal_mode.lower() != "wal":
+		# e.g. network filesystems, where SQLite refuses WAL
+		log.warning(f"{engine.url.database} is using journal_mode={journal_mode} instead of WAL")
+
+	log.debug(f"{engine.url.database}: journal_mode={journal_mode}, synchronous={synchronous}")
+
+	return True
+
+
+def bootstrap(engine):
+	create_tables(engine)
+
+	if not check_database(engine):
+		sys.exit(1)
+
+
+def row_values(obj, exclude=()):
+	return {column.key: getattr(obj, column.key) for column in obj.__table__.columns if column.key not in exclude}
+
+
+def bulk_upsert(connection, model, rows, index_elements, update_columns):
+	"""One INSERT ... ON CONFLICT DO UPDATE statement executed over all rows."""
+	if not rows:
+		return 0
+
+	statement = insert(model.__table__)
+	statement = statement.on_conflict_do_update(
+		index_elements=index_elements,
+		set_={column: statement.excluded[column] for column in update_columns}
+	)
+
+	connection.execute(statement, rows)
+
+	return len(rows)
+
+
+def persist(engine, matches=(), teams=(), definitions=(), fingerprints=None):
+	"""Writes scraped Match, Team and Definition objects in a single transaction,
+	together with the {(kind, match id): digest} fingerprints of their blocks."""
+	from models import Match, Definition, Team, Fingerprint, MATCH_FIELDS
+
+	with engine.begin() as connection:
+		written = bulk_upsert(connection, Match, [row_values(match) for match in matches], ["id"], MATCH_FIELDS)
+		written += bulk_upsert(connection, Team, [row_values(team) for team in teams], ["id"], ["name"])
+
+		# DEF_SHEET is edited by hand and never overwritten.
+		written += bulk_upsert(
+			connection, Definition,
+			[row_values(_def, exclude=("DEF_ID",)) for _def in definitions],
+			["DEF_TYPE", "TEAM_ID"], ["DEF_HLTV"]
+		)
+
+		written += bulk_upsert(
+			connection, Fingerprint,
+			[{"kind": kind, "match_id": match_id, "digest": digest} for (kind, match_id), digest in (fingerprints or {}).items()],
+			["kind", "match_id"], ["digest"]
+		)
+
+	log.debug(f"Persisted {written} rows")
+
+	return written
+
 
 class DBManager:
-	def init(eventid):
-		DBManager.engine = create_engine(f"sqlite:///database/{eventid}.db")
-		DBManager.Session = sessionmaker(bind=DBManager.engine, autoflush=False)
+	def __init__(self, eventid):
+		self.eventid = eventid
+
+		self.engine = connect(f"database/{eventid}.db")
+		self.Session = sessionmaker(bind=self.engine, autoflush=False)
 
-	def update():
+	def update(self):
 		pass
 
-	def create_session(**options):
+	def create_session(self, **options):
 		try:
-			return DBManager.Session(**options)
+			return self.Session(**options)
 
 		except:
 			log.exception("Unhandled exception in DBManager.create_session")
 
 		return None
 
-	def session_add_expunge(object, **options):
+	def session_add_expunge(self, object, **options):
 		if 'expire_on_commit' not in options:
 		    options['expire_on_commit'] = False
 
-		session = DBManager.create_session(**options)
+		session = self.create_session(**options)
 		try:
 		    session.add(object)
 		    session.commit()
@@ -50,4 +188,4 @@ class DBManager:
 		    session.rollback()
 		    raise
 		finally:
-		    session.close()
\ No newline at end of file
+		    session.close()
@@ -0,0 +1,278 @@
+"""extraction.py.
+
+Reads teams and matches out of parsed HLTV pages. Everything here goes from
+a soup to plain records and lists, so the same code runs in the tracker and
+in ParsePool worker processes.
+"""
+import logging
+import re
+
+import exceptions
+from parsers import fingerprint
+from records import MatchRecord, TeamRecord, unix_from_ms, winner
+
+log = logging.getLogger(__name__)
+
+regex_matchid = re.compile(r'matches\/([0-9]{2,10})')
+regex_teamid = re.compile(r'team\/([0-9]{2,10})')
+
+
+def teams_url(soup):
+    """Path of the event's team overview, linked from the matches page."""
+    return soup.find("a", {"class": "event-nav inactive"})["href"]
+
+
+def teams(soup):
+    groups_container = soup.find("div", {"class": "groups-container"})
+    table = groups_container.find("table")
+
+    entries = []
+    for row in table.find_all("tr"):
+        if not row.has_attr("class"):
+            continue
+
+        anchor = row.find("a")
+
+        entries.append(TeamRecord(int(re.search(regex_teamid, anchor["href"]).group(1)), anchor.text))
+
+    return entries
+
+
+def upcoming_blocks(soup, num_daysadvance=1):
+    matchdays = soup.find_all("div", {"data-zonedgrouping-headline-classes": "standard-headline"}, limit=num_daysadvance)
+
+    if not len(matchdays):
+        raise exceptions.NoMatchesFound(1)
+
+    matchdays = matchdays[0].find_all("div", {"class": "match-day"})
+
+    if not len(matchdays):
+        raise exceptions.NoMatchesFound(1)
+
+    blocks = []
+    for s in matchdays:
+        match_day = s.find("span", {"class": "standard-headline"})
+        match_day = match_day.text
+
+        blocks.extend(s.find_all("a"))
+
+        log.debug(f"Finished upcoming matchday (date: {match_day})")
+
+    return blocks
+
+
+def live_blocks(soup):
+    """The live match blocks, or None when the page has no live section."""
+    live_matches = soup.find("div", {"class": "live-matches"})
+
+    if live_matches is None:
+        return None
+
+    return live_matches.find_all(lambda tag: tag.name == 'div' and tag.get('class') == ['live-match'])
+
+
+def result_blocks(soup):
+    blocks = soup.find_all("div", {"class": "result-con"})
+
+    if not len(blocks):
+        raise exceptions.NoMatchesFound(-1)
+
+    return blocks
+
+
+def upcoming_id(matchdata):
+    return int(re.search(regex_matchid, matchdata["href"]).group(1))
+
+
+def parse_upcoming(matchdata):
+    match_id = upcoming_id(matchdata)
+
+    match_map = '?'
+
+    table = matchdata.find("tr")
+    teams = []
+    for tag in table.find_all("div", class_="team map-text".split()):
+        if tag["class"][0] == "team":
+            teams.append(tag.text)
+        elif tag["class"][0] == "map-text":
+            match_map = tag.text
+
+    log.debug(f"Finished upcoming match (id: {match_id})")
+
+    return MatchRecord(
+        id=match_id,
+        unix_ts=unix_from_ms(int(matchdata["data-zonedgrouping-entry-unix"])),
+        state=1,
+        teamname1=teams[0],
+        teamname2=teams[1],
+        map=match_map
+    )
+
+
+def live_id(live_match):
+    return int(live_match.find("a").find("table")["data-livescore-match"])
+
+
+def parse_live(live_match):
+    matchdata = live_match.find("a")
+
+    table = matchdata.find("table")
+
+    match_id = int(table["data-livescore-match"])
+
+    bestof = table.find("td", class_="bestof").text
+    multiple_maps = False
+    if "1" in bestof:
+        match_map = table.find("td", class_="map").text.lower()
+    else:
+        multiple_maps = True
+        map_count = table.find("td", class_="map")
+        match_map = "bo" + len(map_count)
+
+    teams = []
+    for tag in table.find_all("span", class_="team-name"):
+        teams.append(tag.text)
+
+    teamscores = []
+    if multiple_maps:
+        for scorechart in table.find_all("tr"):
+            if scorechart.has_attr("class"):
+                continue
+
+            container = scorechart.find("td", class_="total")
+            try:
+                score = int(container.span.text)
+            except ValueError:
+                score = 0
+
+            teamscores.append(score)
+    else:
+        for scorechart in table.find_all("tr"):
+            if scorechart.has_attr("class"):
+                continue
+
+            container = scorechart.find("td", class_="livescore")
+            try:
+                score = int(container.span.text)
+            except ValueError:
+                score = 0
+
+            teamscores.append(score)
+
+    log.debug(f"Finished ongoing match (id: {match_id}")
+
+    return MatchRecord(
+        id=match_id,
+        state=0,
+        teamname1=teams[0],
+        teamname2=teams[1],
+        teamscore1=teamscores[0],
+        teamscore2=teamscores[1],
+        map=match_map
+    )
+
+
+def result_id(result):
+    return int(re.search(regex_matchid, result.find("a")["href"]).group(1))
+
+
+def parse_result(result):
+    table = result.find("a")
+
+    match_id = int(re.search(regex_matchid, table["href"]).group(1))
+
+    td = table.find("td", class_="date-cell")
+    span = td.find("span")
+    unix_ts = int(span["data-unix"])
+
+    teams = []
+    for data in table.find_all("td", class_="team-cell"):
+        temp = data.find("div", class_="line-align")
+        teams.append(temp.find("div").text)
+
+    t_resultscores = table.find("td", class_="result-score")
+
+    scores = []
+    for data in t_resultscores.find_all("span"):
+        scores.append(int(data.text))
+
+    log.debug(f"Finished match results (id: {match_id}, unix: {unix_ts})")
+
+    return MatchRecord(
+        id=match_id,
+        unix_ts=unix_from_ms(unix_ts),
+        state=-1,
+        teamname1=teams[0],
+        teamname2=teams[1],
+        teamscore1=scores[0],
+        teamscore2=scores[1],
+        map=table.find("div", class_="map-text").text,
+        winner=winner(teams[0], scores[0], teams[1], scores[1])
+    )
+
+
+# Block kind -> (match id, MatchRecord) of one block.
+BLOCK_PARSERS = {
+    "upcoming": (upcoming_id, parse_upcoming),
+    "live": (live_id, parse_live),
+    "results": (result_id, parse_result)
+}
+
+# Kinds of match blocks on each page.
+PAGE_BLOCKS = {
+    "upcoming": ("live", "upcoming"),
+    "results": ("results",),
+    "teams": ()
+}
+
+
+def changed_blocks(kind, blocks, known):
+    """Extracts the blocks whose digest is not the one `known` holds for
+    their (kind, match id). Returns ([(key, digest, record)], [unchanged key])."""
+    block_id, parse = BLOCK_PARSERS[kind]
+
+    changed, unchanged = [], []
+    for block in blocks:
+        key = (kind, block_id(block))
+        digest = fingerprint(block)
+
+        if digest == known.get(key):
+            unchanged.append(key)
+            continue
+
+        changed.append((key, digest, parse(block)))
+
+    return changed, unchanged
+
+
+def extract_page(page, soup, num_daysadvance=1, known=None):
+    """Everything Scraper.get_* need from one page, as plain data. A kind of
+    block the page has none of is None rather than an exception, which
+    would not survive the trip back from a worker process."""
+    if known is None:
+        known = {}
+
+    if page == "teams":
+        return {"teams": teams(soup)}
+
+    if page == "results":
+        try:
+            return {"results": changed_blocks("results", result_blocks(soup), known)}
+
+        except exceptions.NoMatchesFound:
+            return {"results": None}
+
+    extracted = {"teams_url": teams_url(soup), "live_ids": None, "live": None, "upcoming": None}
+
+    blocks = live_blocks(soup)
+    if blocks is not None:
+        extracted["live_ids"] = [live_id(block) for block in blocks]
+        extracted["live"] = changed_blocks("live", blocks, known)
+
+    try:
+        extracted["upcoming"] = changed_blocks("upcoming", upcoming_blocks(soup, num_daysadvance), known)
+
+    except exceptions.NoMatchesFound:
+        pass
+
+    return extracted
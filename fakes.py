@@ -0,0 +1,243 @@
+"""fakes.py.
+
+In-memory stand-ins for the parts of the gspread client used by Sheets,
+for running the bot without Google, and for the HLTV fetcher, for running
+it against saved pages.
+"""
+import json
+import re
+import time
+
+import gspread
+from gspread.utils import a1_to_rowcol
+
+from fetch import Fetcher
+
+regex_range = re.compile(r"^(?:'((?:[^']|'')*)'!)?([A-Z]+)([0-9]+)(?::([A-Z]+)([0-9]*))?$")
+
+
+def parse_range(range_name):
+    """Splits "'Title'!A2:M" style ranges into (title, first_row, first_col, last_row, last_col).
+
+    last_row is None for open-ended ranges.
+    """
+    groups = re.match(regex_range, range_name).groups()
+    title = groups[0].replace("''", "'") if groups[0] is not None else None
+
+    first_row, first_col = a1_to_rowcol(groups[1] + groups[2])
+
+    if groups[3] is None:
+        return title, first_row, first_col, first_row, first_col
+
+    last_row = int(groups[4]) if groups[4] else None
+    _, last_col = a1_to_rowcol(groups[3] + "1")
+
+    return title, first_row, first_col, last_row, last_col
+
+
+class FakeResponse:
+    """Just enough of requests.Response for gspread.exceptions.APIError."""
+
+    def __init__(self, status_code, message=""):
+        self.status_code = status_code
+        self.reason = message
+
+        # The JSON error body, as Tracker.handle_api_error reads it.
+        self.text = json.dumps({"error": {"code": status_code, "message": message, "status": ""}})
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeHTTPResponse:
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeFetcher(Fetcher):
+    """Serves saved HLTV pages by URL; unknown URLs answer 404. Conditional
+    GETs and the thread pool are inherited from Fetcher."""
+
+    def __init__(self, pages=None, **options):
+        super().__init__(**options)
+
+        self.pages = dict(pages or {})  # url -> bytes
+        self.requests = []
+
+    def load(self, url, filename):
+        with open(filename, "rb") as f:
+            self.pages[url] = f.read()
+
+    def get(self, url, **options):
+        self.requests.append(url)
+
+        if url not in self.pages:
+            return FakeHTTPResponse(b"", status_code=404)
+
+        return FakeHTTPResponse(self.pages[url])
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, index=0):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.index = index
+
+        self.cells = {}  # (row, col) -> value
+
+    def __repr__(self):
+        return f"<FakeWorksheet '{self.title}' id:{self.index}>"
+
+    def last_row(self):
+        return max((row for row, _ in self.cells.keys()), default=0)
+
+    def get_values(self, first_row, first_col, last_row, last_col):
+        if last_row is None:
+            last_row = self.last_row()
+
+        values = []
+        for row in range(first_row, last_row + 1):
+            values.append([self.cells.get((row, col), '') for col in range(first_col, last_col + 1)])
+
+        # Mirror the API: trailing empty cells and rows are left out.
+        for row_values in values:
+            while row_values and row_values[-1] == '':
+                row_values.pop()
+
+        while values and not values[-1]:
+            values.pop()
+
+        return values
+
+    def set_values(self, first_row, first_col, values):
+        for row_offset, row_values in enumerate(values):
+            for col_offset, value in enumerate(row_values):
+                if value is None:
+                    continue
+
+                self.cells[(first_row + row_offset, first_col + col_offset)] = '' if value == '' else str(value)
+
+    def edit(self, row, col, value):
+        """Simulates a change made by someone other than the bot."""
+        self.set_values(row, col, [[value]])
+        self.spreadsheet.revision += 1
+
+
+class FakeSpreadsheet:
+    """Enforces a per-minute write quota when `write_quota` is set, answering
+    excess writes with 429 like the real API."""
+
+    def __init__(self, key, titles=("Sheet1",), write_quota=None, clock=time.monotonic):
+        self.id = key
+        self.revision = 1
+
+        self.write_quota = write_quota
+        self.clock = clock
+        self.writes = []    # timestamps of accepted writes
+        self.failures = []  # status codes to answer the next writes with
+        self.rejected = 0
+
+        self.requests = []
+        self.sheets = [FakeWorksheet(self, title, index) for index, title in enumerate(titles)]
+
+    def fail_next(self, count=1, status=503):
+        self.failures.extend([status] * count)
+
+    def check_write(self):
+        if self.failures:
+            self.rejected += 1
+            raise gspread.exceptions.APIError(FakeResponse(self.failures.pop(0), "Injected failure"))
+
+        if self.write_quota is None:
+            return
+
+        now = self.clock()
+        self.writes = [written for written in self.writes if written > now - 60]
+
+        if len(self.writes) >= self.write_quota:
+            self.rejected += 1
+            raise gspread.exceptions.APIError(FakeResponse(429, "Quota exceeded for quota metric 'Write requests'"))
+
+        self.writes.append(now)
+
+    def worksheets(self):
+        return list(self.sheets)
+
+    def get_worksheet(self, index):
+        return self.sheets[index]
+
+    def worksheet_by_title(self, title):
+        if title is None:
+            return self.sheets[0]
+
+        for worksheet in self.sheets:
+            if worksheet.title == title:
+                return worksheet
+
+        raise KeyError(title)
+
+    def values_get(self, range, params=None):
+        self.requests.append(("values_get", range))
+
+        title, first_row, first_col, last_row, last_col = parse_range(range)
+        values = self.worksheet_by_title(title).get_values(first_row, first_col, last_row, last_col)
+
+        response = {"range": range, "majorDimension": "ROWS"}
+        if values:
+            response["values"] = values
+
+        return response
+
+    def values_update(self, range, params=None, body=None):
+        self.check_write()
+        self.requests.append(("values_update", range))
+
+        title, first_row, first_col, _, _ = parse_range(range)
+        self.worksheet_by_title(title).set_values(first_row, first_col, body["values"])
+        self.revision += 1
+
+        return {"updatedRange": range}
+
+    def values_batch_update(self, body=None):
+        self.check_write()
+        self.requests.append(("values_batch_update", [data["range"] for data in body["data"]]))
+
+        for data in body["data"]:
+            title, first_row, first_col, _, _ = parse_range(data["range"])
+            self.worksheet_by_title(title).set_values(first_row, first_col, data["values"])
+
+        self.revision += 1
+
+        return {"totalUpdatedRanges": len(body["data"])}
+
+
+class FakeHTTPClient:
+    """Stands in for gspread.http_client.HTTPClient, whose login() refreshes
+    the access token."""
+
+    def __init__(self):
+        self.logins = 0
+
+    def login(self):
+        self.logins += 1
+
+
+class FakeClient:
+    def __init__(self):
+        self.spreadsheets = {}
+        self.http_client = FakeHTTPClient()
+
+    def create_spreadsheet(self, key, titles=("Sheet1",), **options):
+        self.spreadsheets[key] = FakeSpreadsheet(key, titles, **options)
+        return self.spreadsheets[key]
+
+    def open_by_key(self, key):
+        if key not in self.spreadsheets:
+            self.create_spreadsheet(key)
+
+        return self.spreadsheets[key]
+
+    def get_file_drive_metadata(self, id):
+        return {"id": id, "modifiedTime": str(self.spreadsheets[id].revision)}
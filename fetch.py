@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger(__name__)
+
+HLTV_URL = "https://www.hltv.org"
+
+
+class Page:
+    def __init__(self, url, content=b"", status_code=200, changed=True, fetched_at=None):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.changed = changed
+
+        # What Fetcher.acknowledge saves for the next conditional GET, and
+        # for whom.
+        self.validators = None
+        self.consumer = None
+
+        if fetched_at is None:
+            fetched_at = time.time()
+
+        self.fetched_at = fetched_at
+
+    def __repr__(self):
+        return f"Page({self.url}) [{self.status_code}, changed: {self.changed}]"
+
+
+class Resource:
+    """Freshness policy for one kind of page: it is fetched again once `ttl`
+    seconds have passed since the last fetch, or right away after invalidate()."""
+
+    def __init__(self, name, ttl=0):
+        self.name = name
+        self.ttl = ttl
+        self.fetched_at = None
+
+    def __repr__(self):
+        return f"Resource({self.name}) [ttl: {self.ttl}, fetched_at: {self.fetched_at}]"
+
+    def due(self, now=None):
+        if self.fetched_at is None:
+            return True
+
+        if now is None:
+            now = time.time()
+
+        return now - self.fetched_at >= self.ttl
+
+    def store(self, page):
+        self.fetched_at = page.fetched_at
+
+    def invalidate(self):
+        self.fetched_at = None
+
+
+class Fetcher:
+    """Shared HTTP layer: one pooled keep-alive session per host, plus a
+    thread pool so independent pages can be requested concurrently."""
+
+    def __init__(self, max_workers=4, pool_size=10, timeout=30):
+        self.max_workers = max_workers
+        self.pool_size = pool_size
+        self.timeout = timeout
+
+        self.sessions = {}
+        self.validators = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+
+    def get_session(self, url):
+        host = urlsplit(url).netloc
+
+        with self.lock:
+            session = self.sessions.get(host)
+
+            if session is None:
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+
+                self.sessions[host] = session
+
+        return session
+
+    def get(self, url, **options):
+        options.setdefault("timeout", self.timeout)
+
+        response = self.get_session(url).get(url, **options)
+        log.debug(f"Fetched {url} ({response.status_code}, {len(response.content)} bytes)")
+
+        return response
+
+    def submit(self, url, **options):
+        return self.executor.submit(self.get, url, **options)
+
+    def fetch(self, url, consumer=None, **options):
+        """Conditional GET. The returned page is marked unchanged when the
+        server answers 304 or the body hashes the same as the last page that
+        was acknowledged, so a changed page keeps coming back as changed
+        until its reader is done with it.
+
+        Validators are kept per `consumer`: scrapers sharing a fetcher may
+        follow the same URL, and each has to see a change for itself."""
+        with self.lock:
+            validators = self.validators.get((consumer, url), {})
+
+        headers = dict(options.pop("headers", None) or {})
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        response = self.get(url, headers=headers, **options)
+
+        if response.status_code == 304:
+            log.debug(f"Not modified: {url}")
+            return Page(url, status_code=304, changed=False)
+
+        digest = hashlib.sha1(response.content).hexdigest()
+        changed = digest != validators.get("digest")
+
+        page = Page(url, response.content, response.status_code, changed=changed)
+        page.consumer = consumer
+        page.validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "digest": digest
+        }
+
+        if not changed:
+            log.debug(f"Content unchanged: {url}")
+            self.acknowledge(page)
+
+        return page
+
+    def acknowledge(self, page):
+        """Remembers a fetched page as processed."""
+        if page.validators is None:
+            return
+
+        with self.lock:
+            self.validators[(page.consumer, page.url)] = page.validators
+
+    def submit_fetch(self, url, **options):
+        return self.executor.submit(self.fetch, url, **options)
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+
+            self.sessions = {}
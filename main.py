@@ -2,280 +2,505 @@ import datetime
 import json
 import logging
 import time
-import re
 
-from bs4 import BeautifulSoup
 import gspread
 import requests
+from gspread.utils import rowcol_to_a1
+from sqlalchemy import or_, text
 
 import db
+import extraction
+from capture import Archive
+from changeset import Changeset
 from db import DBManager
-from models import Match, Team, Definition
+from fetch import Fetcher, Resource, HLTV_URL
+from parsepool import ParsePool
+from parsers import make_parser
+from ratings import load_ratings
+from pipeline import Pipeline
+from scheduler import PollScheduler, is_stale
+from workingset import WorkingSet
+from writequeue import TokenBucket, WriteBehindQueue
+from models import Match, Team, Definition, Fingerprint
 
 import exceptions
+import metrics
 from utils import get_credentials, tryconvert, range_to_file, get_creds
 
 log = logging.getLogger(__name__)
 
+SHEET_COLUMNS = 13
+
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files/"
+
+# Seconds before each HLTV page is fetched again. The team list rarely
+# changes once an event has started and is otherwise refreshed on demand.
+RESOURCE_TTLS = {
+    "upcoming": 0,
+    "results": 300,
+    "teams": 6 * 3600
+}
+
+# Placeholder HLTV shows for teams that are not decided yet.
+TBD_TEAM = "TBD"
+
+# Match state each kind of match block stands for.
+BLOCK_STATES = {"upcoming": 1, "live": 0, "results": -1}
+
 
 class Scraper:
-    def __init__(self, eventid, num_daysadvance=1):
+    def __init__(self, eventid, num_daysadvance=1, fetcher=None, parser=None, ttls=None, pool=None):
         self.db = None
 
+        if fetcher is None:
+            fetcher = Fetcher()
+
+        if parser is None:
+            parser = make_parser()
+
+        self.fetcher = fetcher
+        self.parser = parser
+
+        # A parsepool.ParsePool, when pages are parsed in worker processes.
+        self.pool = pool
+
         self.teams = {}
         self.matches = {}
         self.definitions = {}
 
-        self.regex_matchid = re.compile('matches\/([0-9]{2,10})')
-        self.regex_teamid = re.compile('team\/([0-9]{2,10})')
-
         self.eventid = eventid
         self.num_daysadvance = num_daysadvance
 
-    def update(self, session):
+        # Accumulates until the consumer of the scraped data resets it.
+        self.changes = Changeset()
+
+        self.resources = {name: Resource(name, ttl) for name, ttl in {**RESOURCE_TTLS, **(ttls or {})}.items()}
+
+        # (block kind, match id) -> digest of the match's markup last cycle
+        self.fingerprints = {}
+
+        # Every fetched page goes to the capture archive when one is set.
+        self.archive = None
+        self.updates = 0
+
+        self.teams_url = None
+        self.upcoming_response = None
+        self.results_response = None
+        self.teams_response = None
+
+        self.upcoming_soup = None
+        self.results_soup = None
+        self.teams_soup = None
+
+        # Page -> extraction.extract_page of it, for this update only.
+        self.extracted = {}
+
+        # Changed pages whose get_* pass has not gone through yet.
+        self.pending = {}
+
+    def submit(self, name, url, now):
+        if url is None or not self.resources[name].due(now):
+            return None
+
+        return self.fetcher.submit_fetch(url, consumer=self)
+
+    def collect(self, name, future):
+        """Waits for a submitted fetch; returns the page, or None if it was not due."""
+        if future is None:
+            return None
+
+        page = future.result()
+        self.resources[name].store(page)
+
+        if page.changed:
+            self.pending[name] = page
+
+        metrics.FETCHED_BYTES.inc(len(page.content), event=self.eventid, page=name)
+
+        if self.archive is not None:
+            self.archive.record(self.eventid, self.updates, name, page)
+
+        return page
+
+    def refresh(self, name):
+        """Fetches a resource on the next update regardless of its TTL."""
+        log.debug(f"Refreshing {name} on the next update")
+        self.resources[name].invalidate()
+
+    def update(self, session, now=None):
         self.session = session
+        self.updates += 1
+
+        with metrics.PHASE_SECONDS.time(event=self.eventid, phase="update"):
+            return self.fetch_pages(now)
 
-        self.upcoming_response = requests.get(f'http://www.hltv.org/matches?event={self.eventid}')
-        self.upcoming_soup = BeautifulSoup(self.upcoming_response.content, "html.parser")
+    def fetch_pages(self, now=None):
+        if now is None:
+            now = time.time()
 
-        self.results_response = requests.get(f'http://www.hltv.org/results?event={self.eventid}')
-        self.results_soup = BeautifulSoup(self.results_response.content, "html.parser")
+        # The matches and results pages are independent, so both are requested
+        # up front; only the team overview has to wait for the matches page.
+        # Pages still within their TTL are not requested at all.
+        upcoming = self.submit("upcoming", f'{HLTV_URL}/matches?event={self.eventid}', now)
+        results = self.submit("results", f'{HLTV_URL}/results?event={self.eventid}', now)
 
-        teams_overview_link = self.upcoming_soup.find("a", {"class": "event-nav inactive"})
-        teams_overview_link = "https://www.hltv.org" + teams_overview_link["href"]
-        self.teams_response = requests.get(teams_overview_link)
-        self.teams_soup = BeautifulSoup(self.teams_response.content, "html.parser")
+        # A soup left as None means the page was not due or has not changed
+        # since the last cycle, and the get_* pass that reads it is skipped.
+        self.upcoming_soup = None
+        self.results_soup = None
+        self.teams_soup = None
+        self.extracted = {}
+
+        self.upcoming_response = self.collect("upcoming", upcoming)
+        upcoming_parsed = self.parse("upcoming", self.upcoming_response)
+
+        if self.pool is not None:
+            # Have a worker start on the results page while the matches page
+            # is still being parsed.
+            self.results_response = self.collect("results", results)
+            results_parsed = self.parse("results", self.results_response)
+
+        self.read("upcoming", upcoming_parsed)
+
+        teams = self.submit("teams", self.teams_url, now)
+
+        if self.pool is None:
+            self.results_response = self.collect("results", results)
+            results_parsed = self.parse("results", self.results_response)
+
+        self.read("results", results_parsed)
+
+        self.teams_response = self.collect("teams", teams)
+        self.read("teams", self.parse("teams", self.teams_response))
+
+        return self.changed()
+
+    def parse(self, name, page):
+        """The soup of a changed page or, with a parse pool, the future of
+        what a worker extracted from it."""
+        if page is None or not page.changed:
+            return None
+
+        if self.pool is not None:
+            return self.pool.submit(self.parser.name, name, page.content, self.num_daysadvance, self.known_blocks(name))
+
+        return self.parser.parse(page.content, name)
+
+    def read(self, name, parsed):
+        if parsed is None:
+            return
+
+        if self.pool is not None:
+            self.extracted[name] = parsed.result()
+        else:
+            setattr(self, f"{name}_soup", parsed)
+
+        if name == "upcoming":
+            if self.pool is not None:
+                self.teams_url = HLTV_URL + self.extracted["upcoming"]["teams_url"]
+            else:
+                self.teams_url = HLTV_URL + extraction.teams_url(parsed)
+
+    def has_page(self, name):
+        return name in self.extracted or getattr(self, f"{name}_soup") is not None
+
+    def extract(self, name):
+        """What extraction.extract_page found on a page read this update.
+        Without a pool the soup is extracted on first use."""
+        if name not in self.extracted:
+            soup = getattr(self, f"{name}_soup")
+            self.extracted[name] = extraction.extract_page(name, soup, self.num_daysadvance, self.known_blocks(name))
+
+        return self.extracted[name]
+
+    def changed(self):
+        return any(self.has_page(name) for name in ("upcoming", "results", "teams"))
+
+    def processed(self, name):
+        page = self.pending.pop(name, None)
+
+        if page is not None:
+            self.fetcher.acknowledge(page)
+
+    def release(self):
+        # A page whose get_* pass failed is fetched and read again next time,
+        # as it would be if it had changed since.
+        for name in self.pending:
+            log.debug(f"The {name} page was not processed, refreshing it on the next update")
+            self.refresh(name)
+
+        self.pending = {}
+
+        self.upcoming_response = None
+        self.results_response = None
+        self.teams_response = None
+
+        self.upcoming_soup = None
+        self.results_soup = None
+        self.teams_soup = None
+        self.extracted = {}
 
     def get_matches(self):
-        return self.get_ongoing_matches(), self.get_upcoming_matches()
+        matches = self.get_ongoing_matches(), self.get_upcoming_matches()
+        self.processed("upcoming")
+
+        return matches
 
     def get_teams(self):
-        groups_container = self.teams_soup.find("div", {"class": "groups-container"})
-        table = groups_container.find("table")
+        if not self.has_page("teams"):
+            return
 
-        rows = table.find_all("tr")
-        for row in rows:
-            if not row.has_attr("class"):
-                continue
+        with metrics.PHASE_SECONDS.time(event=self.eventid, phase="get_teams"):
+            extracted = self.extract("teams")
 
-            anchor = row.find("a")
+            for record in extracted["teams"]:
+                team = self.teams.get(record.id)
 
-            dictTeam = {}
-            dictTeam["id"] = int(re.search(self.regex_teamid, anchor["href"]).group(1))
-            dictTeam["name"] = anchor.text
+                if team is None:
+                    self.teams[record.id] = Team(id=record.id, name=record.name)
+                    self.changes.teams.add(record.id)
 
-            if dictTeam["id"] in self.teams.keys():
-                self.teams[dictTeam["id"]].set(**dictTeam)
-            else:
-                team = Team(**dictTeam)
-                self.teams[dictTeam["id"]] = team
+                elif team.name != record.name:
+                    team.set(name=record.name)
+                    self.changes.teams.add(record.id)
 
-                self.session.add(team)
+                definiton = self.definitions.get(record.id)
 
-            if dictTeam["id"] in self.definitions.keys():
-                self.definitions[dictTeam["id"]].set(TEAM_ID=dictTeam["id"], DEF_HLTV=dictTeam["name"])
-            else:
-                definiton = Definition(DEF_TYPE="team", TEAM_ID=dictTeam["id"], DEF_HLTV=dictTeam["name"], DEF_SHEET=dictTeam["name"])
-                self.definitions[dictTeam["id"]] = definiton
+                # Only new and renamed definitions go into the index: the
+                # DEF_SHEET held here is not reloaded after external edits.
+                if definiton is None:
+                    definiton = Definition(DEF_TYPE="team", TEAM_ID=record.id, DEF_HLTV=record.name, DEF_SHEET=record.name)
 
-                self.session.add(definiton)
+                    self.definitions[record.id] = definiton
+                    self.changes.definitions.add(record.id)
 
-    def get_upcoming_matches(self):
-        matchdays = self.upcoming_soup.find_all("div", {"data-zonedgrouping-headline-classes": "standard-headline"}, limit=self.num_daysadvance)
+                    if self.db is not None:
+                        self.db.index_definition(definiton)
 
-        if not len(matchdays):
-            raise exceptions.NoMatchesFound(1)
-            return []
+                elif definiton.DEF_HLTV != record.name:
+                    previous_hltv = definiton.DEF_HLTV
+                    definiton.set(DEF_HLTV=record.name)
+                    self.changes.definitions.add(record.id)
 
-        matchdays = matchdays[0].find_all("div", {"class": "match-day"})
+                    if self.db is not None:
+                        self.db.index_definition(definiton, previous_hltv)
 
-        if not len(matchdays):
-            raise exceptions.NoMatchesFound(1)
-            return []
+            metrics.ROWS_PARSED.inc(len(extracted["teams"]), event=self.eventid, page="teams")
 
-        for s in matchdays:
-            match_day = s.find("span", {"class": "standard-headline"})
-            match_day = match_day.text
+        self.processed("teams")
 
-            for matchdata in s.find_all("a"):
-                dictMatch = {}
-                dictMatch["id"] = int(re.search(self.regex_matchid, matchdata["href"]).group(1))
-                dictMatch["unix_ts"] = int(matchdata["data-zonedgrouping-entry-unix"])
-                dictMatch["state"] = 1
+    def merge_matches(self, records):
+        # Matches outside the in-memory working set may still be in SQLite.
+        missing = [record.id for record in records if record.id not in self.matches]
+        if missing and self.db is not None:
+            self.matches.update(self.db.load_matches(missing))
 
-                dictMatch["map"] = '?'
+        for record in records:
+            self.merge_match(record)
 
-                table = matchdata.find("tr")
-                teams = []
-                for tag in table.find_all("div", class_="team map-text".split()):
-                    if tag["class"][0] == "team":
-                        teams.append(tag.text)
-                    elif tag["class"][0] == "map-text":
-                        dictMatch["map"] = tag.text
+    def merge_match(self, record):
+        """Creates or updates the Match of a MatchRecord, leaving matches the
+        record agrees with untouched."""
+        match = self.matches.get(record.id)
 
-                dictMatch["teamname1"] = teams[0]
-                dictMatch["teamname2"] = teams[1]
+        if match is None:
+            if record.unix_ts is None:
+                # Live matches have no start time on the page.
+                record = record._replace(unix_ts=int(time.time()))
 
-                if dictMatch["id"] in self.matches.keys():
-                    self.matches[dictMatch['id']].set(**dictMatch)
-                    self.matches[dictMatch['id']].ms_unix_to_unix()
-                else:
-                    match = Match(**dictMatch)
-                    match.ms_unix_to_unix()
-                    self.matches[dictMatch['id']] = match
+            match = Match(**record.values())
 
-                    self.session.add(match)
+            self.matches[record.id] = match
+            self.changes.add_match(match.id)
 
-                log.debug(f"Finished upcoming match (id: {dictMatch['id']})")
+            self.check_teams(match)
 
-            log.debug(f"Finished upcoming matchday (date: {match_day})")
+            return match
 
-    def get_ongoing_matches(self):
-        live_matches = self.upcoming_soup.find("div", {"class": "live-matches"})
+        fields = record.changed_fields(match)
+        if fields:
+            state = match.state
+            match.set(**{field: getattr(record, field) for field in fields})
 
-        if live_matches is None:
-            raise exceptions.NoMatchesFound(0)
-            return []
+            self.changes.change_match(match.id, fields, state, match.state)
 
-        for live_match in live_matches.find_all(lambda tag: tag.name == 'div' and tag.get('class') == ['live-match']):
-            matchdata = live_match.find("a")
+        return match
 
-            table = matchdata.find("table")
+    def check_teams(self, match):
+        # A team we have never seen means the cached team list is out of date.
+        known = {team.name for team in self.teams.values()}
 
-            dictMatch = {}
-            dictMatch["id"] = int(table["data-livescore-match"])
-            dictMatch["state"] = 0
+        for name in (match.teamname1, match.teamname2):
+            if name and name != TBD_TEAM and name not in known:
+                log.info(f"Unknown team '{name}' in match {match.id}, refreshing the team list")
+                self.refresh("teams")
+                return
 
-            dictMatch["map"] = '?'
+    def known_blocks(self, page):
+        """Fingerprints of the blocks on `page` that may be skipped if their
+        markup is unchanged, see extraction.changed_blocks."""
+        kinds = extraction.PAGE_BLOCKS[page]
 
-            bestof = table.find("td", class_="bestof").text
-            multiple_maps = False
-            if "1" in bestof:
-                dictMatch["map"] = table.find("td", class_="map").text.lower()
-            else:
-                multiple_maps = True
-                map_count = table.find("td", class_="map")
-                dictMatch["map"] = "bo" + len(map_count)
-
-            teams = []
-            for tag in table.find_all("span", class_="team-name"):
-                teams.append(tag.text)
-
-            dictMatch["teamname1"] = teams[0]
-            dictMatch["teamname2"] = teams[1]
-
-            teamscores = []
-            if multiple_maps:
-                for scorechart in table.find_all("tr"):
-                    if scorechart.has_attr("class"):
-                        continue
-
-                    container = scorechart.find("td", class_="total")
-                    try:
-                        score = int(container.span.text)
-                    except ValueError:
-                        score = 0
-
-                    teamscores.append(score)
-            else:
-                for scorechart in table.find_all("tr"):
-                    if scorechart.has_attr("class"):
-                        continue
+        known = {}
+        for key, digest in self.fingerprints.items():
+            if key[0] not in kinds:
+                continue
+
+            # A match that moved on (e.g. went live) while its old block stayed
+            # the same still has to be put back in sync with the page.
+            match = self.matches.get(key[1])
+            if match is None or match.state == BLOCK_STATES[key[0]]:
+                known[key] = digest
+
+        return known
+
+    def merge_blocks(self, kind, changed, unchanged):
+        metrics.BLOCKS_UNCHANGED.inc(len(unchanged), event=self.eventid, page=kind)
+        metrics.ROWS_PARSED.inc(len(changed), event=self.eventid, page=kind)
+
+        self.merge_matches([record for _, _, record in changed])
+
+        # Only once their matches are merged, so a failed merge is retried.
+        for key, digest, _ in changed:
+            self.fingerprints[key] = digest
+            self.changes.fingerprints[key] = digest
 
-                    container = scorechart.find("td", class_="livescore")
-                    try:
-                        score = int(container.span.text)
-                    except ValueError:
-                        score = 0
+        # Blocks that left the page cannot be skipped any more, so their
+        # digests are dropped. The rest stay in SQLite.
+        on_page = set(unchanged).union(key for key, _, _ in changed)
 
-                    teamscores.append(score)
+        for key in [key for key in self.fingerprints if key[0] == kind and key not in on_page]:
+            del self.fingerprints[key]
 
-            dictMatch["teamscore1"] = teamscores[0]
-            dictMatch["teamscore2"] = teamscores[1]
+    def get_upcoming_matches(self):
+        if not self.has_page("upcoming"):
+            return
 
-            if dictMatch["id"] in self.matches.keys():
-                self.matches[dictMatch['id']].set(**dictMatch)
-                self.matches[dictMatch['id']].ms_unix_to_unix()
+        with metrics.PHASE_SECONDS.time(event=self.eventid, phase="get_upcoming_matches"):
+            extracted = self.extract("upcoming")
 
+            # An empty section is a page read like any other, not an error
+            # that would keep the rest of the cycle from running.
+            if extracted["upcoming"] is None:
+                log.info(f"[{self.eventid}] No upcoming matches have been found.")
             else:
-                dictMatch["unix_ts"] = int(time.time())
+                self.merge_blocks("upcoming", *extracted["upcoming"])
+
+    def get_ongoing_matches(self):
+        if not self.has_page("upcoming"):
+            return
 
-                match = Match(**dictMatch)
-                match.ms_unix_to_unix()
+        with metrics.PHASE_SECONDS.time(event=self.eventid, phase="get_ongoing_matches"):
+            extracted = self.extract("upcoming")
 
-                self.matches[dictMatch['id']] = match
+            if extracted["live"] is None:
+                self.check_finished(())
 
-                self.session.add(match)
+                log.info(f"[{self.eventid}] No ongoing matches have been found.")
+            else:
+                self.check_finished(extracted["live_ids"])
 
-                log.debug(f"Finished ongoing match (id: {dictMatch['id']}")
+                self.merge_blocks("live", *extracted["live"])
+
+    def check_finished(self, live_ids):
+        # A match that dropped off the live list has a result waiting, unless
+        # it went live so long ago that it was called off instead.
+        live_ids = set(live_ids)
+        now = time.time()
+
+        if any(match.state == 0 and match_id not in live_ids and not is_stale(match, now) for match_id, match in self.matches.items()):
+            self.refresh("results")
 
     def get_results(self):
-        results = self.results_soup.find_all("div", {"class": "result-con"})
+        if not self.has_page("results"):
+            return
 
-        if not len(results):
-            raise exceptions.NoMatchesFound(-1)
-            return []
+        with metrics.PHASE_SECONDS.time(event=self.eventid, phase="get_results"):
+            extracted = self.extract("results")
 
-        for result in results:
-            table = result.find("a")
+            if extracted["results"] is None:
+                log.info(f"[{self.eventid}] No result matches have been found.")
+            else:
+                self.merge_blocks("results", *extracted["results"])
 
-            dictMatch = {}
-            dictMatch["id"] = int(re.search(self.regex_matchid, table["href"]).group(1))
+        self.processed("results")
 
-            td = table.find("td", class_="date-cell")
-            span = td.find("span")
-            dictMatch["unix_ts"] = int(span["data-unix"])
-            dictMatch["state"] = -1
+    def parse_results(self, soup):
+        """A MatchRecord for every result on a results page, used by the backfill."""
+        return [extraction.parse_result(result) for result in soup.find_all("div", {"class": "result-con"})]
 
-            teams = []
-            for data in table.find_all("td", class_="team-cell"):
-                temp = data.find("div", class_="line-align")
-                teams.append(temp.find("div").text)
 
-            dictMatch["teamname1"] = teams[0]
-            dictMatch["teamname2"] = teams[1]
+class SheetSnapshot:
+    # column_keys = {
+    #      1: "id",          2: "date",
+    #      3: "teamname1",   4: "versus",
+    #      5: "teamname2",   6: "map",
+    #      7: "teamscore1",  8: "score-divider",
+    #      9: "teamscore2", 10: "selection",
+    #     11: "certainty",  12: "flags",
+    #     13: "winner"
+    # }
 
-            t_resultscores = table.find("td", class_="result-score")
+    def __init__(self, values=None, first_row=2):
+        self.first_row = first_row
 
-            scores = []
-            for data in t_resultscores.find_all("span"):
-                scores.append(int(data.text))
+        self.rows = {}  # sheet row -> list of SHEET_COLUMNS values, '' read as None
+        self.ids = {}   # match id -> sheet row
 
-            dictMatch["teamscore1"] = scores[0]
-            dictMatch["teamscore2"] = scores[1]
+        for offset, row_values in enumerate(values or []):
+            self.add_row(first_row + offset, row_values)
 
-            dictMatch["map"] = table.find("div", class_="map-text").text
+    def __len__(self):
+        return len(self.rows)
 
-            if dictMatch["id"] in self.matches.keys():
-                self.matches[dictMatch['id']].set(**dictMatch)
-                self.matches[dictMatch['id']].ms_unix_to_unix()
-                self.matches[dictMatch['id']].determine_winner()
+    def add_row(self, row, values):
+        values = [None if value == '' else value for value in values[:SHEET_COLUMNS]]
+        values.extend([None] * (SHEET_COLUMNS - len(values)))
 
-            else:
-                match = Match(**dictMatch)
-                match.ms_unix_to_unix()
-                match.determine_winner()
+        if values[0] is None:
+            return
 
-                self.matches[dictMatch['id']] = match
+        self.rows[row] = values
 
-                self.session.add(match)
+        match_id = tryconvert(values[0], default=None)
+        if match_id is not None:
+            self.ids.setdefault(match_id, row)
 
-            log.debug(f"Finished match results (id: {dictMatch['id']}, unix: {dictMatch['unix_ts']})")
+    def last_row(self):
+        return max(self.rows.keys(), default=self.first_row - 1)
 
 
 class Sheets:
-    def __init__(self, credentials=None, authlib_session=None):
+    def __init__(self, credentials=None, authlib_session=None, client=None, bucket=None, eventid=None):
         self.credentials = credentials
-        self.client = gspread.authorize(self.credentials)
-        # self.client = Client(None, authlib_session)
+        self.eventid = eventid
+
+        if client is None:
+            client = gspread.authorize(self.credentials)
+            # client = Client(None, authlib_session)
+
+        self.client = client
+
+        # Write quota is per user, so trackers sharing a client share a bucket.
+        if bucket is None:
+            bucket = TokenBucket()
+
+        self.bucket = bucket
+        self.writes = None
 
         self.sheet = None
 
         self.sskey = None
         self.wsheets = {}
+        self.index = 0
 
         self.wsheet_range = {}
 
+        # Drive modifiedTime of the spreadsheet as of the cached snapshot plus
+        # the bot's own writes. None means unknown, always re-read.
+        self.revision = None
+        self.revision_supported = True
+
         self.database = None
 
     def get_spreadsheet(self, sskey):
@@ -300,60 +525,147 @@ class Sheets:
                 selection = index
 
         self.wsheets[selection] = self.sheet.get_worksheet(selection)
+        self.index = selection
 
-    def get_worksheet_range(self, index=None):
-        if not index:
-            index = 0
-
-        # column_keys = {
-        #      1: "id",          2: "date",
-        #      3: "teamname1",   4: "versus",
-        #      5: "teamname2",   6: "map",
-        #      7: "teamscore1",  8: "score-divider",
-        #      9: "teamscore2", 10: "selection",
-        #     11: "certainty",  12: "flags",
-        #     13: "winner"
-        # }
-
-        _range = self.wsheets[index].range(2, 1, 400, 13)
-
-        temp = {}
-
-        for cell in _range:
-            if cell.row not in temp.keys():
-                temp[cell.row] = []
-                temp[cell.row].append(cell)
-            else:
-                if cell.value == '':
-                    cell.value = None
+        worksheet = self.wsheets[selection]
+        self.writes = WriteBehindQueue(
+            self.sheet,
+            lambda *block: self.range_name(worksheet, *block),
+            bucket=self.bucket,
+            labels={"event": self.eventid}
+        )
 
-                temp[cell.row].append(cell)
+    def get_worksheet_range(self, index=None):
+        if index is None:
+            index = self.index
 
-        entries_to_delete = []
-        for _entry in temp.keys():
-            entry = temp[_entry]
+        worksheet = self.wsheets[index]
 
-            if entry[0].value is None or entry[0].value == '':
-                entries_to_delete.append(_entry)
-                continue
+        # An open-ended range returns values up to the last used row only, so
+        # the read grows and shrinks with the sheet.
+        with metrics.PHASE_SECONDS.time(event=self.eventid, phase="sheets_read"):
+            response = self.sheet.values_get(self.range_name(worksheet, 2, 1, None, SHEET_COLUMNS))
 
-        for _entry in entries_to_delete:
-            del temp[_entry]
+        metrics.SHEET_REQUESTS.inc(event=self.eventid, request="values_get")
 
-        self.wsheet_range[index] = temp
+        self.wsheet_range[index] = SheetSnapshot(response.get("values", []), first_row=2)
 
         return
 
+    def get_revision(self):
+        if not self.revision_supported:
+            return None
+
+        metrics.SHEET_REQUESTS.inc(event=self.eventid, request="drive_metadata")
+
+        try:
+            with metrics.PHASE_SECONDS.time(event=self.eventid, phase="sheets_revision"):
+                if hasattr(self.client, "get_file_drive_metadata"):
+                    metadata = self.client.get_file_drive_metadata(self.sskey)
+                else:
+                    response = self.client.request("get", DRIVE_FILES_URL + self.sskey, params={"fields": "modifiedTime"})
+                    metadata = response.json()
+
+        except gspread.exceptions.APIError as err:
+            # Usually missing Drive scope on old stored credentials.
+            log.warning(f"Spreadsheet revision unavailable, re-reading the sheet every cycle: {err}")
+            self.revision_supported = False
+
+            return None
+
+        return metadata.get("modifiedTime")
+
+    def refresh(self, index=None):
+        """Re-reads the worksheet only if someone other than the bot has edited
+        the spreadsheet since the last read.
+
+        Returns:
+            True if the worksheet was read again.
+        """
+        if index is None:
+            index = self.index
+
+        revision = self.get_revision()
+
+        if revision is not None and revision == self.revision and index in self.wsheet_range:
+            log.debug(f"Spreadsheet unchanged (revision: {revision}), using cached snapshot.")
+            return False
+
+        self.get_worksheet_range(index)
+        self.revision = revision
+
+        return True
+
+    def flush(self):
+        # Read first: a revision other than the snapshot's is someone else's
+        # edit, and must not be taken for our own write.
+        before = self.get_revision() if self.revision is not None and len(self.writes) else None
+
+        try:
+            written = self.writes.flush()
+
+        except Exception:
+            self.invalidate()
+            raise
+
+        if written:
+            self.wrote(before)
+
+        return written
+
+    def invalidate(self, index=None):
+        if index is None:
+            index = self.index
+
+        self.wsheet_range.pop(index, None)
+        self.revision = None
+
+        # Queued cells address rows of the dropped snapshot, which may have
+        # moved by the next read. The full sync that follows recomputes them.
+        if index == self.index and self.writes is not None:
+            dropped = self.writes.clear()
+
+            if dropped:
+                log.warning(f"Dropped {dropped} queued cells, they are written again after the next read")
+
+    def wrote(self, before=None):
+        if self.revision is None:
+            return
+
+        if before != self.revision:
+            log.debug(f"Spreadsheet edited since the last read (revision: {before}), reading it again.")
+            self.invalidate()
+            return
+
+        # A user edit landing between the write and this lookup is taken for
+        # our own; it is picked up on the next external change.
+        self.revision = self.get_revision()
+
+    def range_name(self, worksheet, first_row, first_col, last_row, last_col):
+        title = worksheet.title.replace("'", "''")
+
+        if last_row is None:
+            # Open-ended, e.g. A2:M
+            last = rowcol_to_a1(1, last_col)[:-1]
+        else:
+            last = rowcol_to_a1(last_row, last_col)
+
+        return f"'{title}'!{rowcol_to_a1(first_row, first_col)}:{last}"
+
     def append_matches(self, hltv_matches):
-        sheet = self.wsheets[0]
-        rows_taken = self.wsheet_range[0].keys()
-        sheet_ids = [(lambda v: tryconvert(v))(self.wsheet_range[0][entry][0].value) for entry in rows_taken]
-        index = max(rows_taken) + 1
+        if self.index not in self.wsheet_range:
+            # Dropped by a flush that found someone else's edit. The revision
+            # stays unknown, so the next refresh() checks every row again.
+            self.get_worksheet_range()
 
+        snapshot = self.wsheet_range[self.index]
+        index = snapshot.last_row() + 1
+
+        rows = []
         for match_key in hltv_matches.keys():
             match = hltv_matches[match_key]
 
-            if match.id not in sheet_ids:
+            if match.id not in snapshot.ids:
                 definitions = {
                     "map": self.database.get_map_definition(match.map),
                     "teamname1": self.database.get_team_definition(match.teamname1),
@@ -361,25 +673,35 @@ class Sheets:
                     "winner": self.database.get_team_definition(match.winner)
                 }
 
-                cells = sheet.range(index, 1, index, 13)
+                # None leaves a cell untouched (selection and certainty are filled by hand).
+                rows.append([
+                    match.id,
+                    datetime.datetime.fromtimestamp(match.unix_ts).strftime("%m/%d/%Y"),
+                    definitions["teamname1"],
+                    "vs",
+                    definitions["teamname2"],
+                    definitions["map"],
+                    match.teamscore1,
+                    "-",
+                    match.teamscore2,
+                    None,
+                    None,
+                    match.flags,
+                    definitions["winner"]
+                ])
+
+                log.info(f"Appending match to spreadsheet (id: {match.id} '{match.teamname1} vs {match.teamname2}')")
 
-                cells[0].value = match.id
-                cells[1].value = datetime.datetime.fromtimestamp(match.unix_ts).strftime("%m/%d/%Y")
-                cells[2].value = definitions["teamname1"]
-                cells[3].value = "vs"
-                cells[4].value = definitions["teamname2"]
-                cells[5].value = definitions["map"]
-                cells[6].value = match.teamscore1
-                cells[7].value = "-"
-                cells[8].value = match.teamscore2
-                cells[11].value = match.flags
-                cells[12].value = definitions["winner"]
+        for offset, row in enumerate(rows):
+            snapshot.add_row(index + offset, row)
 
-                sheet.update_cells(cells, value_input_option='USER_ENTERED')
+        for offset, row in enumerate(rows):
+            self.writes.set_row(index + offset, row)
 
-                log.info(f"Appended match to spreadsheet (id: {match.id} '{match.teamname1} vs {match.teamname2}')")
+        self.flush()
 
-                index += 1
+        if len(rows) > 0:
+            log.info(f"Appended {len(rows)} matches to spreadsheet.")
 
     def update_matches(self, hltv_matches):
         index_keys = {
@@ -401,82 +723,98 @@ class Sheets:
         do_not_touch = [3, 7, 9, 10, 11]
         special = [1, 2, 4, 5, 12]
 
-        sheet = self.wsheets[0]
+        snapshot = self.wsheet_range[self.index]
 
-        cells = []
         cells_to_update = []
-        for _entry in self.wsheet_range[0].keys():
-            entry = self.wsheet_range[0][_entry]
+        for match_id, row in snapshot.ids.items():
+            match = hltv_matches.get(match_id)
 
-            if entry[0].value is None or entry[0].value == '':
+            if match is None:
                 continue
 
-            if int(entry[0].value) in hltv_matches.keys():
-                match = hltv_matches[int(entry[0].value)]
-
-                definitions = {
-                    "unix_ts": match.date(),
-                    "map": self.database.get_map_definition(match.map),
-                    "teamname1": self.database.get_team_definition(match.teamname1),
-                    "teamname2": self.database.get_team_definition(match.teamname2),
-                    "winner": self.database.get_team_definition(match.winner)
-                }
+            entry = snapshot.rows[row]
 
-                rowChanged = False
-                i = 1
-                for cell in entry[1:]:
-                    if i in do_not_touch:
-                        pass
-                    else:
-                        db_value = getattr(match, index_keys[i])
+            definitions = {
+                "unix_ts": match.date(),
+                "map": self.database.get_map_definition(match.map),
+                "teamname1": self.database.get_team_definition(match.teamname1),
+                "teamname2": self.database.get_team_definition(match.teamname2),
+                "winner": self.database.get_team_definition(match.winner)
+            }
 
-                        if i in special:
-                            db_value = definitions[index_keys[i]]
+            for i in range(1, SHEET_COLUMNS):
+                if i in do_not_touch:
+                    continue
 
-                        sheet_value = tryconvert(cell.value, default=cell.value)
+                db_value = getattr(match, index_keys[i])
 
-                        if sheet_value == db_value:
-                            pass
-                        elif db_value is None:
-                            pass
-                        else:
-                            if not rowChanged:
-                                rowChanged = True
+                if i in special:
+                    db_value = definitions[index_keys[i]]
 
-                            cell.value = db_value
-                            cells_to_update.append(cell)
+                sheet_value = tryconvert(entry[i], default=entry[i])
 
-                    cells.append(cell)
+                if sheet_value == db_value:
+                    pass
+                elif db_value is None:
+                    pass
+                else:
+                    entry[i] = db_value
+                    cells_to_update.append((row, i + 1, db_value))
 
-                    i += 1
+        # Only the changed cells are sent, merged into contiguous ranges.
+        for row, col, value in cells_to_update:
+            self.writes.set(row, col, value)
 
-            else:
-                for cell in entry[1:]:
-                    cells.append(cell)
+        self.flush()
 
         if len(cells_to_update) > 0:
-            sheet.update_cells(cells, value_input_option='USER_ENTERED')
-            range_to_file(cells_to_update, filename="update.txt")
+            if log.isEnabledFor(logging.DEBUG):
+                range_to_file(cells_to_update, filename=f"update_{self.eventid}.txt")
 
             log.info(f"Updated {len(cells_to_update)} cells.")
 
 
 class Database:
-    def __init__(self):
+    def __init__(self, engine=None):
         self.session = None
 
+        self.engine = engine
+        self.watch_connection = None
+
+        # (DEF_TYPE, DEF_HLTV) -> DEF_SHEET, built lazily from the definitions table.
+        self.definition_index = None
+        self.data_version = None
+
     def update_session(self, session):
         self.session = session
 
-    def get_matches(self, _dict):
-        matches = self.session.query(Match).order_by(Match.id)
+    def get_matches(self, _dict, since=None):
+        matches = self.session.query(Match)
+
+        if since is not None:
+            # Upcoming and live matches, plus results newer than `since`.
+            matches = matches.filter(or_(Match.state >= 0, Match.unix_ts >= since))
 
-        for match in matches:
+        for match in matches.order_by(Match.id):
             if match.id == 0:
                 continue
 
             _dict.matches[match.id] = match
-            self.session.add(match)
+            self.session.expunge(match)
+
+    def load_matches(self, ids):
+        loaded = {}
+
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            for match in self.session.query(Match).filter(Match.id.in_(ids[start:start + 500])):
+                loaded[match.id] = match
+                self.session.expunge(match)
+
+        if loaded:
+            log.debug(f"Loaded {len(loaded)} matches from the database")
+
+        return loaded
 
     def get_teams(self, _dict):
         teams = self.session.query(Team).order_by(Team.id)
@@ -486,99 +824,308 @@ class Database:
                 continue
 
             _dict.teams[team.id] = team
-            self.session.add(team)
+            self.session.expunge(team)
+
+    def get_fingerprints(self, _dict):
+        # Only for the working set, older matches are rarely on a page still.
+        ids = list(_dict.matches.keys())
+
+        for start in range(0, len(ids), 500):
+            for _fingerprint in self.session.query(Fingerprint).filter(Fingerprint.match_id.in_(ids[start:start + 500])):
+                _dict.fingerprints[(_fingerprint.kind, _fingerprint.match_id)] = _fingerprint.digest
 
     def get_definitions(self, _dict):
         defs = self.session.query(Definition).filter(Definition.DEF_TYPE == "team").order_by(Definition.TEAM_ID)
 
         for _def in defs:
             _dict.definitions[_def.TEAM_ID] = _def
-            self.session.add(_def)
+            self.session.expunge(_def)
 
-    def get_team_definition(self, def_hltv):
-        _def = self.session.query(Definition).filter(Definition.DEF_TYPE == "team").filter(Definition.DEF_HLTV == def_hltv).first()
+    def build_definition_index(self):
+        index = {}
 
-        if _def is None:
-            return def_hltv
-        else:
-            return _def.DEF_SHEET
+        for _def in self.session.query(Definition).order_by(Definition.DEF_ID):
+            # Keep the first row per key, same as the old .first() lookups.
+            index.setdefault((_def.DEF_TYPE, _def.DEF_HLTV), _def.DEF_SHEET)
+
+        self.definition_index = index
+        log.debug(f"Built definition index ({len(index)} entries)")
+
+    def index_definition(self, definition, previous_hltv=None):
+        if self.definition_index is None:
+            return
+
+        key = (definition.DEF_TYPE, definition.DEF_HLTV)
+
+        if previous_hltv is None:
+            # An older row with the same name wins, as in build_definition_index.
+            self.definition_index.setdefault(key, definition.DEF_SHEET)
+
+        elif previous_hltv != definition.DEF_HLTV:
+            # A rename moves what the table says, which may be newer than
+            # the definition's own DEF_SHEET.
+            self.definition_index[key] = self.definition_index.pop((definition.DEF_TYPE, previous_hltv), definition.DEF_SHEET)
+
+    def invalidate_definitions(self):
+        self.definition_index = None
+
+    def get_data_version(self):
+        # data_version is per connection, so it is always read through the
+        # same one rather than whichever the current session checked out.
+        if self.engine is None:
+            return self.session.execute(text("PRAGMA data_version")).scalar()
+
+        if self.watch_connection is None:
+            self.watch_connection = self.engine.raw_connection()
+
+        cursor = self.watch_connection.cursor()
+        try:
+            return cursor.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            cursor.close()
+
+    def check_definitions(self):
+        """Returns True if the definition index was dropped for reloading."""
+        # data_version only moves when another connection commits to the
+        # database, i.e. when definitions may have been edited outside the bot.
+        version = self.get_data_version()
+        changed = self.data_version is not None and version != self.data_version
+
+        if changed:
+            log.debug("Database changed through another connection, reloading definitions.")
+            self.invalidate_definitions()
+
+        self.data_version = version
+
+        return changed
+
+    def acknowledge_writes(self):
+        # Our own commits through another connection must not look external.
+        self.data_version = self.get_data_version()
+
+    def get_definition(self, def_type, def_hltv):
+        if self.definition_index is None:
+            self.build_definition_index()
+
+        return self.definition_index.get((def_type, def_hltv), def_hltv)
+
+    def get_team_definition(self, def_hltv):
+        return self.get_definition("team", def_hltv)
 
     def get_map_definition(self, def_hltv):
-        _def = self.session.query(Definition).filter(Definition.DEF_TYPE == "map").filter(Definition.DEF_HLTV == def_hltv).first()
+        return self.get_definition("map", def_hltv)
 
-        if _def is None:
-            return def_hltv
-        else:
-            return _def.DEF_SHEET
 
+class Tracker:
+    """Everything needed to follow one HLTV event into one worksheet."""
 
-def main(args):
-    g_credentials = get_credentials(args)
-    ssmanager = Sheets(credentials=g_credentials)
+    def __init__(self, eventid, sskey, worksheet=0, numdaysadvance=1, credentials=None, client=None, fetcher=None, parser=None, scheduler=None, bucket=None, ttls=None, metrics_summary=False, archive=None, pool=None, ratings=None):
+        self.eventid = eventid
+        self.metrics_summary = metrics_summary
 
-    ssmanager.get_spreadsheet(args.sskey)
-    ssmanager.open_worksheet()
+        # ratings.Ratings kept up to date with every result this event gets.
+        self.ratings = ratings
 
-    DBManager.init(args.eventid)
-    db.create_tables(DBManager.engine)
-    session = DBManager.create_session()
+        self.ssmanager = Sheets(credentials=credentials, client=client, bucket=bucket, eventid=eventid)
+        self.ssmanager.get_spreadsheet(sskey)
+        self.ssmanager.open_worksheet(worksheet)
 
-    database = Database()
-    database.update_session(session)
+        self.dbmanager = DBManager(eventid)
+        db.bootstrap(self.dbmanager.engine)
 
-    match_fetch = Scraper(args.eventid, args.numdaysadvance)
+        self.database = Database(self.dbmanager.engine)
+        self.ssmanager.database = self.database
 
-    try:
-        database.get_matches(match_fetch)
-        database.get_teams(match_fetch)
-        database.get_definitions(match_fetch)
+        self.scraper = Scraper(eventid, numdaysadvance, fetcher=fetcher, parser=parser, ttls=ttls, pool=pool)
+        self.scraper.db = self.database
+        self.scraper.archive = archive
+
+        self.working_set = WorkingSet(self.scraper, self.database)
+
+        if scheduler is None:
+            scheduler = PollScheduler()
+
+        self.scheduler = scheduler
+
+        # Reconcile every known match with the sheet until one pass succeeds.
+        self.full_sync = True
+
+        session = self.dbmanager.create_session(expire_on_commit=False)
+        try:
+            self.database.update_session(session)
+            self.working_set.load()
+
+        except exceptions.HLTVError as err:
+            self.handle_hltv_error(err)
+
+        finally:
+            session.close()
+
+    def handle_hltv_error(self, err):
+        metrics.ERRORS.inc(event=self.eventid, source="hltv", error=err.__class__.__name__)
 
-    except exceptions.HLTVError as err:
         if err.__class__.__name__ == "NoMatchesFound":
-            log.info(err.message)
+            log.info(f"[{self.eventid}] {err.message}")
 
         else:
-            log.error(f"Unhandled HLTVError: {err}")
+            log.error(f"[{self.eventid}] Unhandled HLTVError: {err}")
+
+    def handle_api_error(self, err):
+        err_json = json.loads(err.response.text)
+
+        metrics.ERRORS.inc(event=self.eventid, source="sheets", error=err_json["error"]["code"])
+
+        if err_json["error"]["code"] == 401:
+            log.warning("OAuth 2.0 access token has expired. Generating a new one.")
+
+            self.ssmanager.client.http_client.login()
+        else:
+            err_print = json.dumps(err_json, sort_keys=True, indent=4)
+            log.critical(f"[{self.eventid}] Unhandled APIError:\n{err_print}")
+
+    def cycle(self):
+        """Runs one update and returns the number of seconds to wait before the next."""
+        before = metrics.REGISTRY.snapshot(event=self.eventid)
+
+        with metrics.PHASE_SECONDS.time(event=self.eventid, phase="cycle"):
+            interval = self.run_cycle()
+
+        if self.metrics_summary:
+            log.info(metrics.summary(before, metrics.REGISTRY.snapshot(event=self.eventid), event=self.eventid, wait=int(interval)))
+
+        return interval
+
+    def run_cycle(self):
+        # A fresh session per cycle keeps the identity map from growing with
+        # every match ever loaded.
+        session = self.dbmanager.create_session(expire_on_commit=False)
 
-    exit = False
-    while not exit:
         try:
-            database.update_session(session)
-            ssmanager.database = database
-            match_fetch.update(session)
+            self.database.update_session(session)
 
-            match_fetch.get_teams()
-            match_fetch.get_results()
-            match_fetch.get_matches()
+            if self.database.check_definitions():
+                # Any row on the sheet may show an edited definition.
+                self.full_sync = True
 
-            session.flush()
-            session.commit()
+            try:
+                if self.scraper.update(session):
+                    self.scraper.get_teams()
+                    self.scraper.get_results()
+                    self.scraper.get_matches()
+                else:
+                    log.info(f"[{self.eventid}] HLTV pages unchanged since the last update.")
 
-            ssmanager.get_worksheet_range()
-            range_to_file(ssmanager.wsheet_range[0])
+            finally:
+                self.scraper.release()
 
-            ssmanager.update_matches(match_fetch.matches)
-            ssmanager.append_matches(match_fetch.matches)
+            changes = self.scraper.changes
 
-        except exceptions.HLTVError as err:
-            if err.__class__.__name__ == "NoMatchesFound":
-                log.info(err.message)
+            if changes:
+                log.info(f"[{self.eventid}] {changes}")
 
-            else:
-                log.error(f"Unhandled HLTVError: {err}")
+                for match_id, (old_state, new_state) in changes.transitions.items():
+                    log.info(f"[{self.eventid}] Match {match_id} state {old_state} -> {new_state}")
 
-        except gspread.exceptions.APIError as err:
-            err_json = json.loads(err.response.text)
+                with metrics.PHASE_SECONDS.time(event=self.eventid, phase="persist"):
+                    written = db.persist(
+                        self.dbmanager.engine,
+                        matches=[self.scraper.matches[match_id] for match_id in changes.match_ids()],
+                        teams=[self.scraper.teams[team_id] for team_id in changes.teams],
+                        definitions=[self.scraper.definitions[team_id] for team_id in changes.definitions],
+                        fingerprints=changes.fingerprints
+                    )
 
-            if err_json["error"]["code"] == 401:
-                log.warning("OAuth 2.0 access token has expired. Generating a new one.")
+                metrics.ROWS_PERSISTED.inc(written, event=self.eventid)
+                self.database.acknowledge_writes()
 
-                ssmanager.client.login()
+                if self.ratings is not None:
+                    self.rate(changes)
+
+            elif not self.full_sync:
+                log.debug(f"[{self.eventid}] No changes, skipping database and sheet work.")
+                return self.wait()
+
+            if self.ssmanager.refresh() or self.full_sync:
+                # First pass, or someone else edited the sheet: check every row.
+                matches = self.scraper.matches
             else:
-                err_print = json.dumps(err_json, sort_keys=True, indent=4)
-                log.critical(f"Unhandled APIError:\n{err_print}")
+                matches = {match_id: self.scraper.matches[match_id] for match_id in changes.match_ids()}
+
+            # Debug dumps are per event, daemon trackers run side by side.
+            if log.isEnabledFor(logging.DEBUG):
+                range_to_file(self.ssmanager.wsheet_range[self.ssmanager.index].rows, filename=f"range_{self.eventid}.txt")
+
+            self.ssmanager.update_matches(matches)
+            self.ssmanager.append_matches(matches)
+
+            # Changes stay queued on the scraper until a cycle gets this far.
+            self.scraper.changes = Changeset()
+            self.full_sync = False
+
+            self.working_set.evict()
+
+        except exceptions.HLTVError as err:
+            self.handle_hltv_error(err)
+
+        except requests.RequestException as err:
+            # e.g. a timeout; the pages not read yet are refreshed next time.
+            metrics.ERRORS.inc(event=self.eventid, source="hltv", error=err.__class__.__name__)
+            log.error(f"[{self.eventid}] Could not fetch HLTV pages: {err}")
+
+        except gspread.exceptions.APIError as err:
+            self.full_sync = True
+            self.handle_api_error(err)
 
         finally:
-            log.info("Finished update. Waiting 120 seconds...")
+            session.close()
+
+        return self.wait()
+
+    def rate(self, changes, matches=None):
+        """Rates this cycle's results and logs the odds of new upcoming matches.
+        `matches` maps match ids to Match objects, the scraper's by default."""
+        if matches is None:
+            matches = self.scraper.matches
+
+        matches = [matches[match_id] for match_id in changes.match_ids()]
+
+        rated = self.ratings.add_results(matches)
+        if rated:
+            log.info(f"[{self.eventid}] Rated {rated} new results")
+
+        upcoming = [match for match in matches if match.id in changes.new and match.state == 1]
+        for match, favourite, certainty in self.ratings.predict(upcoming):
+            log.info(f"[{self.eventid}] {match}: {favourite} to win ({certainty:.0%})")
+
+    def wait(self):
+        interval = self.scheduler.next_interval(self.scraper.matches.values())
+        log.info(f"[{self.eventid}] Finished update. Waiting {int(interval)} seconds ({self.scheduler.reason})...")
+
+        return interval
+
+
+def main(args):
+    g_credentials = get_credentials(args)
+
+    tracker = Tracker(
+        args.eventid, args.sskey,
+        numdaysadvance=args.numdaysadvance,
+        credentials=g_credentials,
+        parser=make_parser(args.parser),
+        scheduler=PollScheduler(floor=args.pollfloor, ceiling=args.pollceiling, live=args.polllive),
+        ttls={"results": args.resultsttl, "teams": args.teamsttl},
+        metrics_summary=args.metricsjson,
+        archive=Archive(args.capture) if args.capture else None,
+        pool=ParsePool() if args.parsepool else None,
+        ratings=load_ratings(by_map=args.ratingmaps) if args.ratings else None
+    )
+
+    if args.pipeline:
+        Pipeline(tracker).run()
+        return
+
+    exit = False
+    while not exit:
+        interval = tracker.cycle()
 
-        time.sleep(120)
+        time.sleep(interval)
@@ -0,0 +1,216 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+log = logging.getLogger(__name__)
+
+# Seconds; from a cached Sheets lookup up to a slow HLTV response.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+
+        self.values = {}  # label key -> value
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = label_key(labels)
+
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def totals(self):
+        with self.lock:
+            return dict(self.values)
+
+    def render(self):
+        with self.lock:
+            return [f"{self.name}{format_labels(key)} {value}" for key, value in sorted(self.values.items())]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+
+        self.series = {}  # label key -> [bucket counts..., count, sum]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = label_key(labels)
+
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0] * (len(self.buckets) + 2)
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+
+            series[-2] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def totals(self):
+        with self.lock:
+            return {key: series[-1] for key, series in self.series.items()}
+
+    def render(self):
+        lines = []
+
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{format_labels(key, [('le', repr(float(bound)))])} {count}")
+
+                lines.append(f"{self.name}_bucket{format_labels(key, [('le', '+Inf')])} {series[-2]}")
+                lines.append(f"{self.name}_sum{format_labels(key)} {series[-1]}")
+                lines.append(f"{self.name}_count{format_labels(key)} {series[-2]}")
+
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            existing = self.metrics.setdefault(metric.name, metric)
+
+        return existing
+
+    def counter(self, name, help=""):
+        return self.register(Counter(name, help))
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, **labels):
+        """Counter values and histogram sums of the series carrying `labels`,
+        keyed by the metric name joined with its remaining label values."""
+        wanted = set(label_key(labels))
+
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        snapshot = {}
+        for metric in metrics:
+            for key, value in metric.totals().items():
+                if not wanted.issubset(key):
+                    continue
+
+                series = ".".join([metric.name] + [label for name, label in key if (name, label) not in wanted])
+                snapshot[series] = snapshot.get(series, 0) + value
+
+        return snapshot
+
+
+def difference(before, after):
+    """What changed between two snapshots, for the per-cycle summary."""
+    changed = {}
+    for name, value in after.items():
+        delta = value - before.get(name, 0)
+
+        if delta:
+            changed[name] = round(delta, 4) if isinstance(delta, float) else delta
+
+    return changed
+
+
+def summary(before, after, **fields):
+    """One JSON line describing a cycle."""
+    return json.dumps({**fields, **difference(before, after)}, sort_keys=True)
+
+
+REGISTRY = Registry()
+
+PHASE_SECONDS = REGISTRY.histogram("hltv_phase_seconds", "Time spent in each phase of an update")
+FETCHED_BYTES = REGISTRY.counter("hltv_fetched_bytes_total", "Bytes downloaded from HLTV per page")
+ROWS_PARSED = REGISTRY.counter("hltv_rows_parsed_total", "Teams and matches read from HLTV pages")
+BLOCKS_UNCHANGED = REGISTRY.counter("hltv_blocks_unchanged_total", "Match blocks skipped because their markup did not change")
+ROWS_PERSISTED = REGISTRY.counter("hltv_rows_persisted_total", "Rows upserted into SQLite")
+SHEET_REQUESTS = REGISTRY.counter("hltv_sheet_requests_total", "Google Sheets and Drive API requests")
+CELLS_WRITTEN = REGISTRY.counter("hltv_sheet_cells_written_total", "Cells written to the spreadsheet")
+RETRIES = REGISTRY.counter("hltv_sheet_retries_total", "Sheets writes retried after a quota or server error")
+ERRORS = REGISTRY.counter("hltv_errors_total", "Errors by source")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+
+        body = self.registry.render().encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        log.debug(format % args)
+
+
+def serve(port, host="127.0.0.1", registry=REGISTRY):
+    """Serves /metrics from a daemon thread. Returns the server."""
+    handler = type("Handler", (MetricsHandler,), {"registry": registry})
+
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    log.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+
+    return server
@@ -3,7 +3,7 @@ import logging
 import time
 
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Index
 from sqlalchemy.types import BLOB
 from sqlalchemy.dialects.mysql import TEXT
 
@@ -11,9 +11,15 @@ from db import Base
 
 log = logging.getLogger(__name__)
 
+MATCH_FIELDS = ("unix_ts", "state", "teamname1", "teamname2", "teamscore1", "teamscore2", "map", "winner", "flags")
+
 
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        Index("ix_matches_state", "state"),
+        Index("ix_matches_unix_ts", "unix_ts")
+    )
 
     id = Column(Integer, primary_key=True)
     unix_ts = Column(Integer)
@@ -64,6 +70,12 @@ class Match(Base):
         instance = self(**options)
         return instance
 
+    def values(self):
+        return {field: getattr(self, field) for field in MATCH_FIELDS}
+
+    def copy(self):
+        return Match(id=self.id, **self.values())
+
     def ms_unix_to_unix(self, unix_ts=None):
         if self.unix_ts is not None:
             temp = self.unix_ts
@@ -104,7 +116,12 @@ class Match(Base):
 
 class Definition(Base):
     __tablename__ = "definitions"
-    __table_args__ = {'sqlite_autoincrement': True}
+    __table_args__ = (
+        # Conflict target for db.persist: one definition per team.
+        Index("ix_definitions_type_team", "DEF_TYPE", "TEAM_ID", unique=True),
+        Index("ix_definitions_type_hltv", "DEF_TYPE", "DEF_HLTV"),
+        {'sqlite_autoincrement': True}
+    )
 
     DEF_ID = Column(Integer, primary_key=True, autoincrement=True)
     DEF_TYPE = Column(TEXT)
@@ -129,6 +146,9 @@ class Definition(Base):
         self.DEF_HLTV = options.get('DEF_HLTV', self.DEF_HLTV)
         self.DEF_SHEET = options.get('DEF_SHEET', self.DEF_SHEET)
 
+    def copy(self):
+        return Definition(DEF_TYPE=self.DEF_TYPE, TEAM_ID=self.TEAM_ID, DEF_HLTV=self.DEF_HLTV, DEF_SHEET=self.DEF_SHEET)
+
 
 class Team(Base):
     __tablename__ = "teams"
@@ -151,3 +171,57 @@ class Team(Base):
         self.id = options.get('id', self.id)
         self.name = options.get('name', self.name)
         self.previous_aliases = options.get('previous_aliases', self.previous_aliases)
+
+    def copy(self):
+        return Team(id=self.id, name=self.name, previous_aliases=self.previous_aliases)
+
+
+class Fingerprint(Base):
+    """Digest of a match's markup on one kind of page, see extraction.changed_blocks."""
+    __tablename__ = "fingerprints"
+
+    kind = Column(String(16), primary_key=True)
+    match_id = Column(Integer, primary_key=True)
+    digest = Column(String(40), nullable=False)
+
+    def __init__(self, **options):
+        self.kind = None
+        self.match_id = None
+        self.digest = None
+
+        self.set(**options)
+
+    def __repr__(self):
+        return f"Fingerprint(kind: {self.kind}, match: {self.match_id}) {self.digest}"
+
+    def set(self, **options):
+        self.kind = options.get('kind', self.kind)
+        self.match_id = options.get('match_id', self.match_id)
+        self.digest = options.get('digest', self.digest)
+
+
+class BackfillPage(Base):
+    """Checkpoint for backfill.py: one row per stored results page."""
+    __tablename__ = "backfill_pages"
+
+    offset = Column(Integer, primary_key=True)
+    total = Column(Integer)      # results the event had when the page was fetched
+    matches = Column(Integer)
+    unix_ts = Column(Integer)
+
+    def __init__(self, **options):
+        self.offset = None
+        self.total = None
+        self.matches = None
+        self.unix_ts = None
+
+        self.set(**options)
+
+    def __repr__(self):
+        return f"BackfillPage(offset: {self.offset}) [{self.matches} of {self.total}]"
+
+    def set(self, **options):
+        self.offset = options.get('offset', self.offset)
+        self.total = options.get('total', self.total)
+        self.matches = options.get('matches', self.matches)
+        self.unix_ts = options.get('unix_ts', self.unix_ts)
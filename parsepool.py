@@ -0,0 +1,53 @@
+"""parsepool.py.
+
+Parses HLTV pages in worker processes. Building a soup holds the GIL for as
+long as it takes, so with several events in one daemon, or a large results
+page, parsing on the tracker threads stalls everything else in the process.
+
+Workers get the raw page bytes and send back what extraction.extract_page
+makes of them: match and team dicts, never soups. Merging them into the
+Match objects stays in the tracker.
+"""
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import extraction
+from parsers import make_parser
+
+log = logging.getLogger(__name__)
+
+# One parser per backend in each worker, built on its first page.
+parsers = {}
+
+
+def parse_page(backend, page, content, num_daysadvance, known):
+    """Runs in a worker process."""
+    parser = parsers.get(backend)
+    if parser is None:
+        parser = parsers[backend] = make_parser(backend)
+
+    soup = parser.parse(content, page)
+
+    return extraction.extract_page(page, soup, num_daysadvance, known)
+
+
+class ParsePool:
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        self.workers = workers
+
+        # Trackers run on threads, which a forked worker would copy mid-flight.
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        log.info(f"Parsing pages in {workers} worker processes")
+
+    def submit(self, backend, page, content, num_daysadvance=1, known=None):
+        """Returns a future of extraction.extract_page for the page."""
+        return self.executor.submit(parse_page, backend, page, content, num_daysadvance, known or {})
+
+    def close(self):
+        self.executor.shutdown()
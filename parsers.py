@@ -0,0 +1,170 @@
+import hashlib
+import logging
+import re
+
+from bs4 import BeautifulSoup, UnicodeDammit
+
+log = logging.getLogger(__name__)
+
+
+def has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# The only parts of each HLTV page that Scraper.get_* look at. Everything
+# else (scripts, navigation, sidebars, news) is dropped before a soup is built.
+#
+# The matches page is left out on purpose: its live and upcoming entries are
+# <a> tags wrapping a <table>, which libxml2 splits apart, so it always goes
+# through html.parser.
+PAGE_CONTAINERS = {
+    "results": [
+        f"//div[{has_class('result-con')}]",
+        f"//span[{has_class('pagination-data')}]"
+    ],
+    "teams": [
+        f"//div[{has_class('groups-container')}]"
+    ]
+}
+
+
+# The markup of each match block, by page. Parsers stamp these with a digest
+# of their source so extraction.changed_blocks can skip the unchanged ones.
+MATCH_BLOCKS = {
+    "upcoming": [
+        ("a", {"data-zonedgrouping-entry-unix": True}),
+        ("div", {"class": "live-match"})
+    ],
+    "results": [
+        ("div", {"class": "result-con"})
+    ]
+}
+
+FINGERPRINT_ATTRIBUTE = "data-fingerprint"
+
+
+def fingerprint(tag):
+    """Digest of a block's markup, changing whenever anything in the block does."""
+    digest = tag.get(FINGERPRINT_ATTRIBUTE)
+
+    if digest is None:
+        digest = hashlib.sha1(tag.encode()).hexdigest()
+
+    return digest
+
+
+def following_tag(tag):
+    while tag is not None:
+        sibling = tag.find_next_sibling()
+        if sibling is not None:
+            return sibling
+
+        tag = tag.parent
+
+    return None
+
+
+class HTMLParser:
+    name = "html.parser"
+
+    def parse(self, content, page=None):
+        if isinstance(content, bytes):
+            content = UnicodeDammit(content, ["utf-8"]).unicode_markup or ""
+
+        soup = BeautifulSoup(content, "html.parser")
+
+        if page in MATCH_BLOCKS:
+            self.stamp(soup, content, MATCH_BLOCKS[page])
+
+        return soup
+
+    def stamp(self, soup, markup, blocks):
+        """Digests each block's source text, from its start tag up to the next
+        tag after it, using the positions html.parser records."""
+        line_starts = [0] + [newline.end() for newline in re.finditer("\n", markup)]
+
+        def offset(tag):
+            if tag.sourceline is None:
+                return None
+
+            position = line_starts[tag.sourceline - 1] + tag.sourcepos
+
+            # Anything unexpected leaves the block to fingerprint()'s fallback.
+            if not markup.startswith("<" + tag.name, position):
+                return None
+
+            return position
+
+        for name, attrs in blocks:
+            for tag in soup.find_all(name, attrs):
+                start = offset(tag)
+
+                following = following_tag(tag)
+                end = len(markup) if following is None else offset(following)
+
+                if start is None or end is None:
+                    continue
+
+                tag[FINGERPRINT_ATTRIBUTE] = hashlib.sha1(markup[start:end].encode()).hexdigest()
+
+
+class LXMLParser(HTMLParser):
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree
+        import lxml.html
+
+        self.html = lxml.html
+        self.selectors = {page: etree.XPath(" | ".join(paths)) for page, paths in PAGE_CONTAINERS.items()}
+
+    def parse(self, content, page=None):
+        if page not in self.selectors:
+            return super().parse(content, page)
+
+        if not content or not content.strip():
+            return BeautifulSoup("", self.name)
+
+        document = self.html.fromstring(content)
+        selected = self.selectors[page](document)
+
+        # Skip containers nested inside another selected container, they are
+        # already serialized along with their ancestor.
+        selected_set = set(selected)
+        fragments = [
+            self.serialize(element)
+            for element in selected
+            if not any(ancestor in selected_set for ancestor in element.iterancestors())
+        ]
+
+        del document, selected, selected_set
+
+        return BeautifulSoup(b"<html><body>" + b"".join(fragments) + b"</body></html>", self.name, from_encoding="utf-8")
+
+    def serialize(self, element):
+        # Hashing the bytes libxml2 produces anyway is much cheaper than
+        # re-encoding the block from the soup later on.
+        markup = self.html.tostring(element, encoding="utf-8", with_tail=False)
+        digest = hashlib.sha1(markup).hexdigest()
+
+        # The digest goes into the start tag of the markup already produced
+        # rather than serializing the element a second time.
+        start = len(element.tag) + 1
+
+        return b'%s %s="%s"%s' % (markup[:start], FINGERPRINT_ATTRIBUTE.encode(), digest.encode(), markup[start:])
+
+
+def make_parser(backend=None):
+    if backend == HTMLParser.name:
+        return HTMLParser()
+
+    try:
+        return LXMLParser()
+
+    except ImportError:
+        if backend == LXMLParser.name:
+            raise
+
+        log.warning("lxml is not installed, falling back to html.parser.")
+
+    return HTMLParser()
@@ -0,0 +1,275 @@
+import logging
+import queue
+import threading
+import time
+
+import gspread
+
+import db
+import exceptions
+import metrics
+from changeset import Changeset
+
+log = logging.getLogger(__name__)
+
+
+class Batch:
+    """Detached copies of what one scrape produced, safe to hand to other
+    threads while the scraper keeps mutating its own objects."""
+
+    def __init__(self, changes, matches, teams=(), definitions=(), full=False):
+        self.changes = changes
+        self.matches = matches          # match id -> Match copy
+        self.teams = list(teams)
+        self.definitions = list(definitions)
+        self.full = full                # matches holds the whole working set
+        self.resync = False             # definitions were edited outside the bot
+
+    @classmethod
+    def capture(cls, scraper, full=False):
+        changes = scraper.changes
+
+        if full:
+            match_ids = scraper.matches.keys()
+        else:
+            match_ids = changes.match_ids()
+
+        return cls(
+            changes,
+            {match_id: scraper.matches[match_id].copy() for match_id in match_ids},
+            teams=[scraper.teams[team_id].copy() for team_id in changes.teams],
+            definitions=[scraper.definitions[team_id].copy() for team_id in changes.definitions],
+            full=full
+        )
+
+    def merge(self, other):
+        """Folds a newer batch into this one; newer copies win."""
+        self.changes.merge(other.changes)
+        self.matches.update(other.matches)
+        self.teams.extend(other.teams)
+        self.definitions.extend(other.definitions)
+        self.full = self.full or other.full
+        self.resync = self.resync or other.resync
+
+
+class Pipeline:
+    """Runs a Tracker as three threads joined by bounded queues:
+
+        scrape -> persist -> publish
+
+    The scraper polls HLTV on its scheduler's cadence, the persister writes
+    each batch to SQLite, and the publisher drains everything that piled up
+    while Sheets was busy into a single update.
+    """
+
+    def __init__(self, tracker, queue_size=8, publish_retry=30):
+        from main import Database
+
+        self.tracker = tracker
+        self.publish_retry = publish_retry
+
+        self.persist_queue = queue.Queue(maxsize=queue_size)
+        self.publish_queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+
+        # The publisher reads definitions on its own thread and session; it
+        # notices the persister's commits through data_version.
+        self.publish_database = Database(tracker.dbmanager.engine)
+        tracker.ssmanager.database = self.publish_database
+
+        # Only watches data_version: the persister is the one connection that
+        # can tell its own commits from edits made outside the bot.
+        self.persist_database = Database(tracker.dbmanager.engine)
+
+        self.published = {}  # match id -> Match copy, the publisher's view of the working set
+
+    def put(self, target, batch):
+        # Blocks while the next stage is behind, but gives up when stopping.
+        while not self.stop_event.is_set():
+            try:
+                target.put(batch, timeout=1)
+                return True
+
+            except queue.Full:
+                continue
+
+        return False
+
+    def get(self, source, timeout=1):
+        try:
+            return source.get(timeout=timeout)
+
+        except queue.Empty:
+            return None
+
+    def scrape_stage(self):
+        tracker = self.tracker
+        scraper = tracker.scraper
+        first = True
+
+        while not self.stop_event.is_set():
+            session = tracker.dbmanager.create_session(expire_on_commit=False)
+
+            try:
+                tracker.database.update_session(session)
+
+                try:
+                    if scraper.update(session):
+                        scraper.get_teams()
+                        scraper.get_results()
+                        scraper.get_matches()
+
+                finally:
+                    scraper.release()
+
+                if scraper.changes or first:
+                    batch = Batch.capture(scraper, full=first)
+
+                    if self.put(self.persist_queue, batch):
+                        scraper.changes = Changeset()
+                        first = False
+
+                        tracker.working_set.evict()
+
+            except exceptions.HLTVError as err:
+                tracker.handle_hltv_error(err)
+
+            except Exception:
+                log.exception(f"[{tracker.eventid}] Unhandled exception in scrape stage")
+
+            finally:
+                session.close()
+
+            interval = tracker.scheduler.next_interval(scraper.matches.values())
+            log.info(f"[{tracker.eventid}] Scraped. Next poll in {int(interval)} seconds ({tracker.scheduler.reason})...")
+
+            self.stop_event.wait(interval)
+
+    def persist_stage(self):
+        while not self.stop_event.is_set():
+            batch = self.get(self.persist_queue)
+
+            if batch is None:
+                continue
+
+            while not self.stop_event.is_set():
+                try:
+                    if self.persist_database.check_definitions():
+                        batch.resync = True
+
+                    if batch.changes:
+                        with metrics.PHASE_SECONDS.time(event=self.tracker.eventid, phase="persist"):
+                            written = db.persist(
+                                self.tracker.dbmanager.engine,
+                                matches=[batch.matches[match_id] for match_id in batch.changes.match_ids()],
+                                teams=batch.teams,
+                                definitions=batch.definitions,
+                                fingerprints=batch.changes.fingerprints
+                            )
+
+                        metrics.ROWS_PERSISTED.inc(written, event=self.tracker.eventid)
+                        self.persist_database.acknowledge_writes()
+
+                    break
+
+                except Exception:
+                    log.exception(f"[{self.tracker.eventid}] Persisting failed, retrying")
+                    self.stop_event.wait(1)
+
+            if batch.changes and self.tracker.ratings is not None:
+                self.rate(batch)
+
+            self.put(self.publish_queue, batch)
+
+    def rate(self, batch):
+        # The batch's copies, the scraper's own matches belong to its thread.
+        try:
+            self.tracker.rate(batch.changes, batch.matches)
+
+        except Exception:
+            log.exception(f"[{self.tracker.eventid}] Rating failed")
+
+    def publish_stage(self):
+        tracker = self.tracker
+        pending = None
+
+        while not self.stop_event.is_set():
+            # Coalesce everything that arrived while the last publish ran.
+            batch = self.get(self.publish_queue, timeout=1 if pending is None else 0)
+            while batch is not None:
+                if pending is None:
+                    pending = batch
+                else:
+                    pending.merge(batch)
+
+                batch = self.get(self.publish_queue, timeout=0)
+
+            if pending is None:
+                continue
+
+            session = tracker.dbmanager.create_session(expire_on_commit=False)
+
+            try:
+                self.publish_database.update_session(session)
+
+                # Every persisted batch moves data_version here, so this only
+                # reloads the index; edits are flagged by the persister.
+                self.publish_database.check_definitions()
+
+                self.published.update(pending.matches)
+
+                if tracker.ssmanager.refresh() or pending.full or pending.resync or tracker.full_sync:
+                    matches = self.published
+                else:
+                    matches = {match_id: self.published[match_id] for match_id in pending.changes.match_ids()}
+
+                tracker.ssmanager.update_matches(matches)
+                tracker.ssmanager.append_matches(matches)
+
+                log.info(f"[{tracker.eventid}] Published {pending.changes}")
+
+                pending = None
+                tracker.full_sync = False
+
+                self.evict()
+
+            except gspread.exceptions.APIError as err:
+                tracker.full_sync = True
+                tracker.handle_api_error(err)
+
+                self.stop_event.wait(self.publish_retry)
+
+            except Exception:
+                log.exception(f"[{tracker.eventid}] Unhandled exception in publish stage")
+
+                self.stop_event.wait(self.publish_retry)
+
+            finally:
+                session.close()
+
+    def evict(self):
+        horizon = self.tracker.working_set.horizon()
+
+        for match_id in [match_id for match_id, match in self.published.items()
+                         if match.state == -1 and match.unix_ts is not None and match.unix_ts < horizon]:
+            del self.published[match_id]
+
+    def run(self):
+        threads = [
+            threading.Thread(target=self.scrape_stage, name="scrape", daemon=True),
+            threading.Thread(target=self.persist_stage, name="persist", daemon=True),
+            threading.Thread(target=self.publish_stage, name="publish", daemon=True)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            while not self.stop_event.is_set():
+                time.sleep(1)
+
+        finally:
+            self.stop_event.set()
+
+            for thread in threads:
+                thread.join(timeout=5)
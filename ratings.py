@@ -0,0 +1,280 @@
+"""ratings.py.
+
+Elo ratings of the teams in the finished matches of the event databases,
+and win probabilities for the matches still to be played.
+
+A history is rated in batches of matches no team plays twice in. Updates
+within a batch are independent of each other, so each batch is a handful
+of array operations, while every team still goes through its own matches in
+order: the ratings come out the same as rating one match at a time.
+"""
+import glob
+import logging
+import os
+import threading
+
+from sqlalchemy import select
+
+from db import DBManager
+from models import Match
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+log = logging.getLogger(__name__)
+
+BASE_RATING = 1500.0
+K_FACTOR = 32.0
+SCALE = 400.0
+
+RESULT_COLUMNS = ("id", "unix_ts", "teamname1", "teamname2", "teamscore1", "teamscore2", "map")
+
+
+def map_key(name):
+    """The map a match is played on, or None for '?' and best-of-N series."""
+    if not name or name == "?" or name.startswith("bo"):
+        return None
+
+    return name.lower()
+
+
+def expected(rating1, rating2, scale=SCALE):
+    """Chance of the first side winning, for numbers or arrays."""
+    return 1.0 / (1.0 + 10.0 ** ((rating2 - rating1) / scale))
+
+
+def schedule(team1, team2, teams):
+    """Batch of every match: one after the last batch either team played in."""
+    last = [-1] * teams
+
+    batches = []
+    for a, b in zip(team1.tolist(), team2.tolist()):
+        batch = max(last[a], last[b]) + 1
+        last[a] = last[b] = batch
+
+        batches.append(batch)
+
+    return np.array(batches, dtype=np.int64)
+
+
+def rate(ratings, team1, team2, score, k=K_FACTOR, scale=SCALE):
+    """Rates matches given oldest first, updating `ratings` in place. `team1`
+    and `team2` index into `ratings`, `score` is 1, 0.5 or 0 for team1."""
+    if not len(team1):
+        return ratings
+
+    batches = schedule(team1, team2, len(ratings))
+
+    order = np.argsort(batches, kind="stable")
+    bounds = np.flatnonzero(np.diff(batches[order])) + 1
+
+    for batch in np.split(order, bounds):
+        a, b = team1[batch], team2[batch]
+
+        delta = k * (score[batch] - expected(ratings[a], ratings[b], scale))
+        ratings[a] += delta
+        ratings[b] -= delta
+
+    return ratings
+
+
+def positions(keys, index):
+    """Index of every key, adding the ones `index` does not hold yet."""
+    return np.array([index.setdefault(key, len(index)) for key in keys], dtype=np.int64)
+
+
+def event_ids(directory="database"):
+    return sorted(int(name) for name in (os.path.basename(path)[:-3] for path in glob.glob(os.path.join(directory, "*.db"))) if name.isdigit())
+
+
+def load_results(engines):
+    """(id, unix_ts, teamname1, teamname2, teamscore1, teamscore2, map) of every
+    finished match in the given event databases."""
+    columns = [Match.__table__.c[column] for column in RESULT_COLUMNS]
+    statement = select(*columns).where(Match.state == -1, Match.teamscore1.is_not(None), Match.teamscore2.is_not(None))
+
+    rows = []
+    for engine in engines:
+        with engine.connect() as connection:
+            rows.extend(tuple(row) for row in connection.execute(statement))
+
+    return rows
+
+
+class Ratings:
+    """Elo ratings per team and, with `by_map`, per team and map.
+
+    fit() rates a whole history at once, add_results() carries the ratings
+    forward one finished match at a time, so a tracker never has to go
+    through the history again.
+    """
+
+    def __init__(self, k=K_FACTOR, base=BASE_RATING, scale=SCALE, by_map=False):
+        if np is None:
+            raise ImportError("Ratings need numpy, install it with: pip install numpy")
+
+        self.k = k
+        self.base = base
+        self.scale = scale
+        self.by_map = by_map
+
+        self.teams = {}   # team name -> index into self.ratings
+        self.ratings = np.empty(0)
+
+        self.slots = {}   # (team name, map) -> index into self.map_ratings
+        self.map_ratings = np.empty(0)
+
+        self.rated = set()  # match ids
+
+        # Reentrant: probability() and predict() read through rating().
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.rated)
+
+    def fit(self, rows):
+        """Rates the rows of load_results() from scratch, oldest first."""
+        with self.lock:
+            rows = [row for row in rows if row[4] is not None and row[5] is not None]
+
+            self.teams, self.ratings = {}, np.empty(0)
+            self.slots, self.map_ratings = {}, np.empty(0)
+            self.rated = set()
+
+            if not rows:
+                return self
+
+            ids, unix_ts, teamnames1, teamnames2, teamscores1, teamscores2, maps = zip(*rows)
+
+            order = np.lexsort((np.array(ids), np.array([ts or 0 for ts in unix_ts], dtype=np.float64)))
+            score = (np.sign(np.array(teamscores1, dtype=np.float64) - np.array(teamscores2, dtype=np.float64)) + 1) / 2
+
+            team1 = positions(teamnames1, self.teams)
+            team2 = positions(teamnames2, self.teams)
+
+            self.ratings = rate(np.full(len(self.teams), self.base), team1[order], team2[order], score[order], self.k, self.scale)
+
+            if self.by_map:
+                played = [i for i in order.tolist() if map_key(maps[i]) is not None]
+
+                slot1 = positions(((teamnames1[i], map_key(maps[i])) for i in played), self.slots)
+                slot2 = positions(((teamnames2[i], map_key(maps[i])) for i in played), self.slots)
+
+                self.map_ratings = rate(np.full(len(self.slots), self.base), slot1, slot2, score[played], self.k, self.scale)
+
+            self.rated = set(ids)
+
+        log.info(f"Rated {len(rows)} matches between {len(self.teams)} teams")
+
+        return self
+
+    def index(self, name):
+        index = self.teams.get(name)
+
+        if index is None:
+            index = self.teams[name] = len(self.ratings)
+            self.ratings = np.append(self.ratings, self.base)
+
+        return index
+
+    def slot(self, name, key):
+        slot = self.slots.get((name, key))
+
+        if slot is None:
+            slot = self.slots[(name, key)] = len(self.map_ratings)
+            self.map_ratings = np.append(self.map_ratings, self.base)
+
+        return slot
+
+    def add_results(self, matches):
+        """Rates the finished matches not rated yet. Returns how many were."""
+        added = 0
+
+        with self.lock:
+            for match in matches:
+                if match.state != -1 or match.id in self.rated or match.teamscore1 is None or match.teamscore2 is None:
+                    continue
+
+                score = (np.sign(match.teamscore1 - match.teamscore2) + 1) / 2
+
+                # Indices first: adding a team replaces the array.
+                a, b = self.index(match.teamname1), self.index(match.teamname2)
+                self.update(self.ratings, a, b, score)
+
+                key = map_key(match.map)
+                if self.by_map and key is not None:
+                    a, b = self.slot(match.teamname1, key), self.slot(match.teamname2, key)
+                    self.update(self.map_ratings, a, b, score)
+
+                self.rated.add(match.id)
+                added += 1
+
+        return added
+
+    def update(self, ratings, a, b, score):
+        delta = self.k * (score - expected(ratings[a], ratings[b], self.scale))
+        ratings[a] += delta
+        ratings[b] -= delta
+
+    # Readers take the lock too: add_results() replaces the arrays while
+    # it adds teams, so an index may not be in the array read next to it.
+    def rating(self, name, map=None):
+        key = map_key(map)
+
+        with self.lock:
+            if self.by_map and key is not None and (name, key) in self.slots:
+                return float(self.map_ratings[self.slots[(name, key)]])
+
+            index = self.teams.get(name)
+            return self.base if index is None else float(self.ratings[index])
+
+    def probability(self, teamname1, teamname2, map=None):
+        """Chance of teamname1 beating teamname2. Map ratings are used when
+        both teams have played the map, overall ratings otherwise."""
+        key = map_key(map)
+
+        with self.lock:
+            if not (self.by_map and key is not None and (teamname1, key) in self.slots and (teamname2, key) in self.slots):
+                map = None
+
+            return float(expected(self.rating(teamname1, map), self.rating(teamname2, map), self.scale))
+
+    def predict(self, matches):
+        """(match, favourite, certainty) for every match given."""
+        predictions = []
+
+        with self.lock:
+            for match in matches:
+                probability = self.probability(match.teamname1, match.teamname2, match.map)
+
+                if probability >= 0.5:
+                    predictions.append((match, match.teamname1, probability))
+                else:
+                    predictions.append((match, match.teamname2, 1 - probability))
+
+        return predictions
+
+
+def load_ratings(eventids=None, **options):
+    """Ratings fitted on the results of the given events, or of every event
+    database there is."""
+    if eventids is None:
+        eventids = event_ids()
+
+    return Ratings(**options).fit(load_results([DBManager(eventid).engine for eventid in eventids]))
+
+
+def main(args):
+    ratings = load_ratings(args.history, k=args.kfactor, by_map=args.ratingmaps)
+
+    session = DBManager(args.eventid).create_session()
+    try:
+        upcoming = session.query(Match).filter(Match.state == 1).order_by(Match.unix_ts, Match.id).all()
+
+    finally:
+        session.close()
+
+    for match, favourite, certainty in ratings.predict(upcoming):
+        log.info(f"{match}: {favourite} ({certainty:.0%})")
@@ -0,0 +1,44 @@
+"""records.py.
+
+Matches and teams as extraction reads them off HLTV pages, before any ORM
+object is involved. Records are compared against the tracked Match and Team
+objects, which are only created or updated for rows that actually changed.
+"""
+from collections import namedtuple
+
+
+def unix_from_ms(unix_ts):
+    """HLTV pages give milliseconds, see Match.ms_unix_to_unix."""
+    if unix_ts is not None and (unix_ts % 1000) == 0 and len(str(unix_ts)) > 10:
+        return unix_ts / 1000
+
+    return unix_ts
+
+
+def winner(teamname1, teamscore1, teamname2, teamscore2):
+    if teamscore1 is None or teamscore2 is None or teamscore1 == teamscore2:
+        return None
+
+    return teamname1 if teamscore1 > teamscore2 else teamname2
+
+
+class MatchRecord(namedtuple("MatchRecord", (
+    "id", "unix_ts", "state", "teamname1", "teamname2", "teamscore1", "teamscore2", "map", "winner"
+), defaults=(None,) * 8)):
+    """One match as one block on a page shows it. None stands for something
+    the block does not show, e.g. the start time of a live match, and leaves
+    the tracked value as it is."""
+    __slots__ = ()
+
+    def values(self):
+        return {field: value for field, value in zip(self._fields, self) if value is not None}
+
+    def changed_fields(self, match):
+        return [
+            field for field, value in zip(self._fields[1:], self[1:])
+            if value is not None and getattr(match, field) != value
+        ]
+
+
+class TeamRecord(namedtuple("TeamRecord", ("id", "name"))):
+    __slots__ = ()
@@ -3,17 +3,60 @@ import logging
 
 from oauth2client import tools
 
+import backfill
+import capture
+import daemon
 import main
+import metrics
+import ratings
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(parents=[tools.argparser])
-    parser.add_argument('-e', "--eventid", type=int, required=True)
-    parser.add_argument('-k', "--sskey", required=True)
+    parser.add_argument('-e', "--eventid", type=int)
+    parser.add_argument('-k', "--sskey")
+    parser.add_argument('-j', "--jobs", help="JSON file listing {eventid, sskey, worksheet} jobs to track in one process")
+    parser.add_argument('-w', "--workers", type=int, default=4, help="Events updated at the same time with --jobs")
     parser.add_argument('-n', "--numdaysadvance", type=int, default=1)
+    parser.add_argument('-p', "--parser", choices=['lxml', 'html.parser'], default=None, help="HTML parser backend (default: lxml when installed)")
+    parser.add_argument("--parsepool", action="store_true", help="Parse HLTV pages in worker processes, one per CPU core")
+    parser.add_argument("--ratings", action="store_true", help="Rate teams on the stored results and log win probabilities for new upcoming matches")
+    parser.add_argument("--ratingmaps", action="store_true", help="Also rate teams per map, used where the map of a match is known")
+    parser.add_argument("--pipeline", action="store_true", help="Run scraping, database writes and sheet updates as separate stages")
+    parser.add_argument("--pollfloor", type=int, default=30, help="Shortest wait between updates in seconds")
+    parser.add_argument("--pollceiling", type=int, default=1800, help="Longest wait between updates in seconds")
+    parser.add_argument("--polllive", type=int, default=60, help="Wait between updates while a match is live in seconds")
+    parser.add_argument("--resultsttl", type=int, default=300, help="Seconds before the results page is fetched again")
+    parser.add_argument("--teamsttl", type=int, default=6 * 3600, help="Seconds before the team list is fetched again")
+    parser.add_argument("--capture", help="Append every fetched HLTV page to this archive for later replay")
+    parser.add_argument("--metricsport", type=int, help="Serve Prometheus metrics on this local port")
+    parser.add_argument("--metricsjson", action="store_true", help="Log a one-line JSON summary after every update")
     parser.add_argument("-l", "--log", choices=['debug', 'info', 'warning', 'error', 'critical'], default="info", type=str, required=False, help="Set minimum logging level for messages to be logged to console")
 
+    # Without a subcommand the bot runs as before.
+    subparsers = parser.add_subparsers(dest="command")
+
+    backfill_parser = subparsers.add_parser("backfill", help="Store every results page of an event, resuming an interrupted run")
+    backfill_parser.add_argument('-e', "--eventid", type=int, required=True)
+    backfill_parser.add_argument('-k', "--sskey", help="Also write the backfilled matches to this spreadsheet")
+    backfill_parser.add_argument('-c', "--concurrency", type=int, default=4, help="Results pages fetched at the same time")
+    backfill_parser.add_argument("--restart", action="store_true", help="Ignore checkpoints from earlier runs")
+
+    replay_parser = subparsers.add_parser("replay", help="Rerun the cycles recorded with --capture, offline and without waiting")
+    replay_parser.add_argument("archive")
+    replay_parser.add_argument('-e', "--eventid", type=int, help="Only replay this event")
+    replay_parser.add_argument('-d', "--directory", help="Keep the replayed databases here instead of a temporary directory")
+
+    predict_parser = subparsers.add_parser("predict", help="Print win probabilities for the upcoming matches of an event")
+    predict_parser.add_argument('-e', "--eventid", type=int, required=True)
+    predict_parser.add_argument("--history", type=int, nargs="+", help="Events whose results are rated (default: every event database)")
+    predict_parser.add_argument("--kfactor", type=float, default=32, help="Rating points at stake in one match")
+    predict_parser.add_argument("--ratingmaps", action="store_true", help="Also rate teams per map, used where the map of a match is known")
+
     args = parser.parse_args()
 
+    if args.command is None and args.jobs is None and (args.eventid is None or args.sskey is None):
+        parser.error("--eventid and --sskey are required unless --jobs is given")
+
     logging_levels = {
         "debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING,
         "error": logging.ERROR, "critical": logging.CRITICAL
@@ -27,8 +70,20 @@ if __name__ == "__main__":
 
     log.addHandler(file_log)
 
+    if args.metricsport is not None:
+        metrics.serve(args.metricsport)
+
     try:
-    	main.main(args)
+    	if args.command == "backfill":
+    		backfill.main(args)
+    	elif args.command == "replay":
+    		capture.main(args)
+    	elif args.command == "predict":
+    		ratings.main(args)
+    	elif args.jobs is not None:
+    		daemon.main(args)
+    	else:
+    		main.main(args)
 
     except KeyboardInterrupt as e:
     	log.info(f"Script stopped manually: {repr(e)}")
@@ -0,0 +1,79 @@
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# A match that should have started this long ago and is still not finished
+# was most likely cancelled or removed on HLTV.
+STALE_AFTER = 6 * 3600
+
+
+def is_stale(match, now, stale_after=STALE_AFTER):
+    return match.unix_ts is not None and match.unix_ts < now - stale_after
+
+
+class PollScheduler:
+    """Picks the delay before the next poll from the scraped matches.
+
+    Live matches poll at `live` seconds. Otherwise the delay is a fraction of
+    the time left until the nearest upcoming match, and with nothing pending
+    it doubles every idle cycle. The result is always kept within
+    [floor, ceiling]. Upcoming and live matches that should have started more
+    than `stale_after` seconds ago are ignored.
+    """
+
+    def __init__(self, floor=30, ceiling=1800, live=60, idle=120, backoff=2.0, lead_fraction=0.25, stale_after=STALE_AFTER):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.live = live
+        self.idle = idle
+        self.backoff = backoff
+        self.lead_fraction = lead_fraction
+        self.stale_after = stale_after
+
+        self.idle_interval = None
+        self.reason = None
+
+    def clamp(self, interval):
+        return max(self.floor, min(self.ceiling, interval))
+
+    def next_interval(self, matches, now=None):
+        if now is None:
+            now = time.time()
+
+        live = 0
+        nearest = None
+        for match in matches:
+            if match.state not in (0, 1) or is_stale(match, now, self.stale_after):
+                continue
+
+            if match.state == 0:
+                live += 1
+            elif match.unix_ts is not None:
+                if nearest is None or match.unix_ts < nearest:
+                    nearest = match.unix_ts
+
+        if live:
+            self.idle_interval = None
+            interval = self.live
+            reason = f"{live} live"
+
+        elif nearest is not None:
+            self.idle_interval = None
+            # Past start times mean a match should go live any moment.
+            interval = max(nearest - now, 0) * self.lead_fraction
+            reason = f"next match in {int(nearest - now)}s"
+
+        else:
+            if self.idle_interval is None:
+                self.idle_interval = self.idle
+            else:
+                self.idle_interval = min(self.idle_interval * self.backoff, self.ceiling)
+
+            interval = self.idle_interval
+            reason = "nothing pending"
+
+        interval = self.clamp(interval)
+        self.reason = reason
+
+        return interval
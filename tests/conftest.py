@@ -0,0 +1,70 @@
+import os
+import sys
+
+import pytest
+
+# The bot's modules live at the top of the repository, not in a package.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs a test in an empty directory, DBManager keeps its databases under ./database"""
+    (tmp_path / "database").mkdir()
+    monkeypatch.chdir(tmp_path)
+
+    return tmp_path
+
+
+class Clock:
+    """Stands in for time.monotonic and time.sleep: sleeping moves it forward."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def make_tracker(workdir):
+    """Builds Trackers on fake HLTV pages and a fake spreadsheet, every page
+    fetched on every cycle."""
+    import fakes
+    from main import RESOURCE_TTLS, Tracker
+    from writequeue import TokenBucket
+
+    trackers = []
+
+    def make(eventid, pages, client=None, **options):
+        options.setdefault("ttls", {name: 0 for name in RESOURCE_TTLS})
+
+        tracker = Tracker(
+            eventid, "key",
+            client=client or fakes.FakeClient(),
+            fetcher=fakes.FakeFetcher(pages),
+            bucket=TokenBucket(rate=10 ** 9, capacity=10 ** 9),
+            **options
+        )
+
+        # No real backoff between retried writes.
+        tracker.ssmanager.writes.sleep = lambda seconds: None
+
+        trackers.append(tracker)
+        return tracker
+
+    yield make
+
+    for tracker in trackers:
+        tracker.scraper.fetcher.close()
+        tracker.dbmanager.engine.dispose()
@@ -0,0 +1,59 @@
+"""Minimal HLTV pages with just the markup extraction reads."""
+import time
+
+from fetch import HLTV_URL
+
+
+def upcoming(count=5, live=1, ts=None):
+    if ts is None:
+        ts = int(time.time()) * 1000 + 3600000
+
+    lives = "".join(f'''<div class="live-match"><a href="/matches/{9000 + i}/live"><table class="table" data-livescore-match="{9000 + i}">
+<tr class="header"><td class="bestof">Best of 1</td><td class="map">Inferno</td></tr>
+<tr><td><span class="team-name">LiveA{i}</span></td><td class="livescore"><span>{i + 3}</span></td><td class="total"><span>0</span></td></tr>
+<tr><td><span class="team-name">LiveB{i}</span></td><td class="livescore"><span>7</span></td><td class="total"><span>0</span></td></tr>
+</table></a></div>''' for i in range(live))
+
+    matches = "".join(f'''<a href="/matches/{1000 + i}/a-vs-b" data-zonedgrouping-entry-unix="{ts + i * 60000}"><table><tr>
+<td><div class="team">Team{i}</div></td><td><div class="map-text">bo1</div></td><td><div class="team">Team{i + 1}</div></td>
+</tr></table></a>''' for i in range(count))
+
+    return f'''<html><body><div class="nav"><a class="event-nav inactive" href="/events/1/teams">Teams</a></div>
+<div class="live-matches">{lives}</div>
+<div class="upcoming-matches"><div data-zonedgrouping-headline-classes="standard-headline"><div class="match-day">
+<span class="standard-headline">Today</span>{matches}</div></div></div>
+</body></html>'''.encode()
+
+
+def results(count=5, offset=0, total=None, ts=None):
+    if ts is None:
+        ts = int(time.time()) * 1000 - 3600000
+
+    if total is None:
+        total = count
+
+    blocks = "".join(f'''<div class="result-con"><a href="/matches/{2000 + offset + i}/result"><div class="result"><table><tr>
+<td class="team-cell"><div class="line-align"><div>Team{i}</div></div></td>
+<td class="result-score"><span>16</span> - <span>{i % 15}</span></td>
+<td class="team-cell"><div class="line-align"><div>Team{i + 2}</div></div></td>
+<td><div class="map-text">nuke</div></td><td class="date-cell"><span data-unix="{ts - (offset + i) * 60000}">date</span></td>
+</tr></table></div></a></div>''' for i in range(count))
+
+    pagination = f'<span class="pagination-data">{offset + 1} - {offset + count} of {total:,}</span>' if count else ""
+
+    return f'<html><body>{pagination}<div class="results-all">{blocks}</div></body></html>'.encode()
+
+
+def teams(count=6):
+    rows = "".join(f'<tr class="team-row"><td><a href="/team/{500 + i}/team">Team{i}</a></td></tr>' for i in range(count))
+
+    return f'<html><body><div class="groups-container"><table><tr><th>Team</th></tr>{rows}</table></div></body></html>'.encode()
+
+
+def event(eventid, upcoming_page=None, results_page=None, teams_page=None):
+    """url -> page of everything a Tracker fetches for an event."""
+    return {
+        f"{HLTV_URL}/matches?event={eventid}": upcoming() if upcoming_page is None else upcoming_page,
+        f"{HLTV_URL}/results?event={eventid}": results() if results_page is None else results_page,
+        f"{HLTV_URL}/events/1/teams": teams() if teams_page is None else teams_page
+    }
@@ -0,0 +1,21 @@
+"""Helpers for tests that run the pipeline's threads."""
+import time
+
+
+class Every:
+    """Polls HLTV as fast as a test needs."""
+    reason = "test"
+
+    def next_interval(self, matches, now=None):
+        return 0.05
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+
+        time.sleep(0.05)
+
+    return False
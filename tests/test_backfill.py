@@ -0,0 +1,87 @@
+import os
+
+from sqlalchemy import func, select
+
+import db
+import fakes
+from backfill import Backfill, results_url
+from db import DBManager
+from models import Match
+
+# Saved results pages of an event with 45 results, and of the same event
+# after ten more were played.
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "backfill")
+
+EVENT = 7
+TOTAL = 45
+PAGE_SIZE = 10
+
+
+def load_results(fetcher, total=TOTAL):
+    fetcher.pages.clear()
+
+    for offset in range(0, total, PAGE_SIZE):
+        fetcher.load(results_url(EVENT, offset), os.path.join(FIXTURES, f"results_{total}_{offset}.html"))
+
+    return fetcher
+
+
+def stored_matches(dbmanager):
+    with dbmanager.engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(Match)).scalar()
+
+
+def make_backfill(dbmanager, fetcher):
+    return Backfill(EVENT, dbmanager, fetcher=fetcher, concurrency=2)
+
+
+def test_backfill_stores_every_page(workdir):
+    dbmanager = DBManager(EVENT)
+    db.bootstrap(dbmanager.engine)
+
+    backfill = make_backfill(dbmanager, load_results(fakes.FakeFetcher()))
+
+    assert backfill.run() == 5
+    assert (backfill.page_size, backfill.total) == (PAGE_SIZE, TOTAL)
+    assert stored_matches(dbmanager) == TOTAL
+
+
+def test_backfill_resumes_after_failed_pages(workdir):
+    dbmanager = DBManager(EVENT)
+    db.bootstrap(dbmanager.engine)
+
+    fetcher = load_results(fakes.FakeFetcher())
+    missing = {url: fetcher.pages.pop(url) for url in (results_url(EVENT, 20), results_url(EVENT, 40))}
+
+    backfill = make_backfill(dbmanager, fetcher)
+    backfill.run()
+
+    assert sorted(backfill.failed) == [20, 40]
+    assert stored_matches(dbmanager) == TOTAL - 15
+
+    fetcher.pages.update(missing)
+    fetcher.requests.clear()
+
+    backfill = make_backfill(dbmanager, fetcher)
+    backfill.run()
+
+    # The first page always, otherwise only what the checkpoints lack.
+    assert sorted(fetcher.requests) == sorted([results_url(EVENT, 0), *missing])
+    assert backfill.failed == []
+    assert stored_matches(dbmanager) == TOTAL
+
+
+def test_backfill_resume_follows_shifted_results(workdir):
+    dbmanager = DBManager(EVENT)
+    db.bootstrap(dbmanager.engine)
+
+    fetcher = load_results(fakes.FakeFetcher())
+    make_backfill(dbmanager, fetcher).run()
+
+    # Ten new results push every stored row down one page.
+    load_results(fetcher, TOTAL + PAGE_SIZE)
+    fetcher.requests.clear()
+
+    make_backfill(dbmanager, fetcher).run()
+
+    assert fetcher.requests == [results_url(EVENT, 0)]
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+
+import capture
+import pages
+
+
+def record_cycles(make_tracker, path):
+    archive = capture.Archive(str(path))
+    tracker = make_tracker(3, pages.event(3, upcoming_page=pages.upcoming(4)), archive=archive)
+
+    tracker.cycle()
+    tracker.scraper.fetcher.pages.update(pages.event(3, upcoming_page=pages.upcoming(6), results_page=pages.results(8)))
+    tracker.cycle()
+
+    return tracker, archive
+
+
+def test_archive_round_trip(make_tracker, workdir):
+    path = workdir / "capture.gz"
+    _, archive = record_cycles(make_tracker, path)
+
+    records = list(capture.read(str(path)))
+
+    assert len(records) == archive.written == 6
+    assert [(record.update, record.resource) for record in records[:3]] == [(1, "upcoming"), (1, "results"), (1, "teams")]
+    assert records[0].content == pages.upcoming(4)
+
+
+def test_truncated_archive_keeps_complete_records(make_tracker, workdir):
+    path = workdir / "capture.gz"
+    record_cycles(make_tracker, path)
+
+    truncated = workdir / "truncated.gz"
+    truncated.write_bytes(path.read_bytes()[:-20])
+
+    assert len(list(capture.read(str(truncated)))) == 5
+
+
+def test_replay_rebuilds_the_same_sheet(make_tracker, workdir, monkeypatch):
+    path = workdir / "capture.gz"
+    tracker, _ = record_cycles(make_tracker, path)
+    recorded = tracker.ssmanager.sheet.get_worksheet(0).get_values(2, 1, None, 13)
+
+    # A fresh directory, so the replay starts from empty databases.
+    os.makedirs(workdir / "replay" / "database")
+    monkeypatch.chdir(workdir / "replay")
+
+    replays = capture.replay(str(path))
+    result = replays[3]
+
+    try:
+        assert result.cycles == 2
+        assert result.failures == []
+        assert set(result.tracker.scraper.matches) == set(tracker.scraper.matches)
+        assert result.client.open_by_key("replay").get_worksheet(0).get_values(2, 1, None, 13) == recorded
+
+    finally:
+        result.close()
+
+
+def test_tracker_does_not_import_the_fakes():
+    code = "import sys, main; sys.exit('fakes' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    assert subprocess.run([sys.executable, "-c", code], cwd=root).returncode == 0
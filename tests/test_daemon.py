@@ -0,0 +1,24 @@
+import fakes
+import pages
+from daemon import Daemon, Job
+
+
+def test_jobs_on_the_same_event_each_get_the_pages(workdir):
+    client = fakes.FakeClient()
+    fetcher = fakes.FakeFetcher(pages.event(5))
+
+    # One event published to two spreadsheets.
+    daemon = Daemon([Job(5, "first"), Job(5, "second")], client=client, fetcher=fetcher)
+
+    try:
+        for tracker in daemon.trackers:
+            daemon.run_cycle(tracker)
+
+        for key in ("first", "second"):
+            assert client.open_by_key(key).get_worksheet(0).last_row() == 1 + 5 + 1 + 5
+
+    finally:
+        fetcher.close()
+
+        for tracker in daemon.trackers:
+            tracker.dbmanager.engine.dispose()
@@ -0,0 +1,54 @@
+import sqlite3
+
+from sqlalchemy import inspect
+
+import db
+from db import DBManager
+from models import Definition
+
+
+def old_database(workdir, eventid, rows):
+    """A definitions table as older versions created it, without the unique index."""
+    connection = sqlite3.connect(workdir / "database" / f"{eventid}.db")
+
+    try:
+        with connection:
+            connection.execute(
+                "CREATE TABLE definitions (DEF_ID INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "DEF_TYPE TEXT, TEAM_ID INTEGER, DEF_HLTV TEXT NOT NULL, DEF_SHEET TEXT)"
+            )
+            connection.executemany("INSERT INTO definitions (DEF_TYPE, TEAM_ID, DEF_HLTV, DEF_SHEET) VALUES (?, ?, ?, ?)", rows)
+
+    finally:
+        connection.close()
+
+
+def test_bootstrap_dedupes_team_definitions(workdir):
+    old_database(workdir, 9, [
+        ("team", 1, "Alpha", "Alpha (edited)"),
+        ("team", 2, "Beta", "Beta"),
+        ("team", 1, "Alpha", "Alpha"),
+        ("map", None, "de_nuke", "Nuke"),
+        ("map", None, "de_mirage", "Mirage")
+    ])
+
+    dbmanager = DBManager(9)
+    db.bootstrap(dbmanager.engine)
+
+    indexes = {index["name"]: index for index in inspect(dbmanager.engine).get_indexes("definitions")}
+    assert indexes["ix_definitions_type_team"]["unique"]
+
+    # Writes upsert against the new index.
+    db.persist(dbmanager.engine, definitions=[Definition(DEF_TYPE="team", TEAM_ID=1, DEF_HLTV="Alpha Renamed", DEF_SHEET="Alpha")])
+
+    with dbmanager.engine.connect() as connection:
+        rows = connection.exec_driver_sql("SELECT DEF_TYPE, TEAM_ID, DEF_HLTV, DEF_SHEET FROM definitions ORDER BY DEF_ID").fetchall()
+
+    assert [tuple(row) for row in rows] == [
+        ("team", 1, "Alpha Renamed", "Alpha (edited)"),
+        ("team", 2, "Beta", "Beta"),
+        ("map", None, "de_nuke", "Nuke"),
+        ("map", None, "de_mirage", "Mirage")
+    ]
+
+    dbmanager.engine.dispose()
@@ -0,0 +1,97 @@
+import sqlite3
+import threading
+
+import fakes
+import pages
+from pipeline import Pipeline
+from polling import Every, wait_for
+
+TEAMS_URL = f"{pages.HLTV_URL}/events/1/teams"
+
+
+def edit_definition(workdir, eventid, def_hltv, def_sheet):
+    """Edits a definition the way a user would, outside the bot."""
+    connection = sqlite3.connect(workdir / "database" / f"{eventid}.db")
+
+    try:
+        with connection:
+            connection.execute("UPDATE definitions SET DEF_SHEET = ? WHERE DEF_HLTV = ?", (def_sheet, def_hltv))
+
+    finally:
+        connection.close()
+
+
+def test_team_list_keeps_external_edits(make_tracker, workdir):
+    tracker = make_tracker(4, pages.event(4))
+    tracker.cycle()
+
+    edit_definition(workdir, 4, "Team1", "Edited")
+
+    for count in (7, 8):
+        tracker.scraper.fetcher.pages[TEAMS_URL] = pages.teams(count)
+        tracker.cycle()
+
+        assert tracker.database.get_team_definition("Team1") == "Edited"
+
+    assert tracker.database.get_team_definition("Team7") == "Team7"
+
+
+def test_renamed_team_keeps_external_edit(make_tracker, workdir):
+    tracker = make_tracker(4, pages.event(4))
+    tracker.cycle()
+
+    edit_definition(workdir, 4, "Team1", "Edited")
+
+    tracker.scraper.fetcher.pages[TEAMS_URL] = pages.teams(7)
+    tracker.cycle()
+    assert tracker.database.get_team_definition("Team1") == "Edited"
+
+    tracker.scraper.fetcher.pages[TEAMS_URL] = pages.teams(7).replace(b">Team1<", b">Team One<")
+    tracker.cycle()
+
+    assert tracker.database.get_team_definition("Team One") == "Edited"
+    assert tracker.database.get_team_definition("Team1") == "Team1"
+
+
+def sheet_cells(client):
+    worksheet = client.open_by_key("key").get_worksheet(0)
+    return [cell for row in worksheet.get_values(2, 1, None, 13) for cell in row]
+
+
+def test_external_edit_rerenders_every_row(make_tracker, workdir):
+    client = fakes.FakeClient()
+    tracker = make_tracker(4, pages.event(4), client=client)
+    tracker.cycle()
+
+    edit_definition(workdir, 4, "Team1", "Edited")
+
+    # Nothing changed on HLTV, the edit alone has to reach the sheet.
+    tracker.cycle()
+
+    cells = sheet_cells(client)
+    assert "Team1" not in cells
+    assert cells.count("Edited") == 4
+
+
+def test_pipeline_rerenders_every_row_after_external_edit(make_tracker, workdir):
+    client = fakes.FakeClient()
+    tracker = make_tracker(4, pages.event(4), client=client, scheduler=Every())
+    pipeline = Pipeline(tracker)
+
+    thread = threading.Thread(target=pipeline.run, daemon=True)
+    thread.start()
+
+    try:
+        assert wait_for(lambda: "Team1" in sheet_cells(client))
+
+        edit_definition(workdir, 4, "Team1", "Edited")
+
+        # A new team, so the next batch has no match rows of its own.
+        tracker.scraper.fetcher.pages[TEAMS_URL] = pages.teams(7)
+
+        assert wait_for(lambda: sheet_cells(client).count("Edited") == 4)
+        assert "Team1" not in sheet_cells(client)
+
+    finally:
+        pipeline.stop_event.set()
+        thread.join()
@@ -0,0 +1,53 @@
+import hashlib
+import time
+
+import lxml.html
+
+import pages
+from parsers import FINGERPRINT_ATTRIBUTE, LXMLParser
+
+RESULTS_URL = f"{pages.HLTV_URL}/results?event=8"
+
+
+def result_fingerprints(scraper):
+    return {key for key in scraper.fingerprints if key[0] == "results"}
+
+
+def test_lxml_stamps_the_digest_of_each_block():
+    content = pages.results(3)
+    soup = LXMLParser().parse(content, "results")
+
+    elements = lxml.html.fromstring(content).find_class("result-con")
+    digests = [hashlib.sha1(lxml.html.tostring(element, encoding="utf-8", with_tail=False)).hexdigest() for element in elements]
+
+    assert [block[FINGERPRINT_ATTRIBUTE] for block in soup.find_all("div", {"class": "result-con"})] == digests
+
+
+def test_fingerprints_follow_the_page(make_tracker):
+    ts = int(time.time()) * 1000 - 3600000
+    tracker = make_tracker(8, pages.event(8, results_page=pages.results(10, ts=ts)))
+    tracker.cycle()
+
+    assert len(result_fingerprints(tracker.scraper)) == 10
+
+    # Results move to later pages: their digests are no use any more.
+    tracker.scraper.fetcher.pages[RESULTS_URL] = pages.results(4, ts=ts)
+    tracker.cycle()
+
+    assert result_fingerprints(tracker.scraper) == {("results", 2000 + i) for i in range(4)}
+
+
+def test_only_working_set_fingerprints_are_loaded(make_tracker):
+    # Finished well before the working set's retention.
+    old = (int(time.time()) - 7 * 24 * 3600) * 1000
+    event = pages.event(8, results_page=pages.results(10, ts=old))
+
+    tracker = make_tracker(8, event)
+    tracker.cycle()
+    assert len(result_fingerprints(tracker.scraper)) == 10
+
+    restarted = make_tracker(8, event)
+
+    assert result_fingerprints(restarted.scraper) == set()
+    assert {match_id for _, match_id in restarted.scraper.fingerprints} <= set(restarted.scraper.matches)
+    assert len(restarted.scraper.fingerprints) == 6
@@ -0,0 +1,88 @@
+import itertools
+import threading
+
+import pages
+from models import Match
+from pipeline import Pipeline
+from polling import Every, wait_for
+from ratings import Ratings
+
+
+def result(match_id, team1, team2, score1, score2, map="nuke"):
+    return Match(id=match_id, unix_ts=1600000000 + match_id, state=-1, teamname1=team1, teamname2=team2, teamscore1=score1, teamscore2=score2, map=map)
+
+
+def history():
+    pairs = list(itertools.combinations([f"Team{i}" for i in range(6)], 2))
+
+    return [result(i, *pairs[i % len(pairs)], 16, i % 16, ("nuke", "mirage", "bo3")[i % 3]) for i in range(1, 200)]
+
+
+def rows(matches):
+    return [(match.id, match.unix_ts, match.teamname1, match.teamname2, match.teamscore1, match.teamscore2, match.map) for match in matches]
+
+
+def test_adding_results_matches_rating_the_history():
+    matches = history()
+
+    fitted = Ratings(by_map=True).fit(rows(matches))
+
+    added = Ratings(by_map=True)
+    assert added.add_results(matches) == len(matches)
+    assert added.add_results(matches) == 0
+
+    for team in fitted.teams:
+        assert added.rating(team) == fitted.rating(team)
+        assert added.rating(team, "mirage") == fitted.rating(team, "mirage")
+
+
+def test_predict_favours_the_stronger_team():
+    ratings = Ratings().fit(rows([result(i, "Strong", "Weak", 16, 4) for i in range(1, 6)]))
+    upcoming = Match(id=10, state=1, teamname1="Weak", teamname2="Strong", map="?")
+
+    [(match, favourite, certainty)] = ratings.predict([upcoming])
+
+    assert match is upcoming
+    assert favourite == "Strong"
+    assert certainty > 0.5
+
+
+def test_predict_while_results_are_added():
+    ratings = Ratings(by_map=True)
+    errors = []
+
+    def add():
+        try:
+            for i in range(1, 3000):
+                ratings.add_results([result(i, f"New{i}", f"New{i + 1}", 16, 3, "inferno")])
+
+        except Exception as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=add)
+    thread.start()
+
+    while thread.is_alive():
+        name = f"New{len(ratings.teams)}"
+        ratings.predict([Match(id=0, state=1, teamname1=name, teamname2="New1", map="inferno")])
+
+    thread.join()
+
+    assert errors == []
+    assert len(ratings) == 2999
+
+
+def test_pipeline_rates_results(make_tracker):
+    ratings = Ratings()
+    tracker = make_tracker(6, pages.event(6, results_page=pages.results(12)), scheduler=Every(), ratings=ratings)
+    pipeline = Pipeline(tracker)
+
+    thread = threading.Thread(target=pipeline.run, daemon=True)
+    thread.start()
+
+    try:
+        assert wait_for(lambda: len(ratings) == 12)
+
+    finally:
+        pipeline.stop_event.set()
+        thread.join()
@@ -0,0 +1,47 @@
+import time
+
+from main import Scraper
+from models import Match
+from scheduler import PollScheduler
+
+NOW = 1700000000
+
+
+def match(match_id, state, unix_ts):
+    return Match(id=match_id, state=state, unix_ts=unix_ts, teamname1="A", teamname2="B")
+
+
+def test_live_matches_poll_at_the_live_interval():
+    scheduler = PollScheduler(live=60)
+
+    assert scheduler.next_interval([match(1, 0, NOW - 3600)], now=NOW) == 60
+    assert scheduler.reason == "1 live"
+
+
+def test_stale_live_matches_are_ignored():
+    scheduler = PollScheduler(live=60, idle=120)
+
+    # Went live a day ago and never showed up in the results.
+    assert scheduler.next_interval([match(1, 0, NOW - 24 * 3600)], now=NOW) == 120
+    assert scheduler.reason == "nothing pending"
+
+
+def test_upcoming_match_sets_the_lead():
+    scheduler = PollScheduler(lead_fraction=0.25)
+
+    assert scheduler.next_interval([match(1, 1, NOW + 4000), match(2, 1, NOW - 24 * 3600)], now=NOW) == 1000
+
+
+def test_only_recent_live_matches_refresh_the_results():
+    scraper = Scraper(1, fetcher=object())
+    results = scraper.resources["results"]
+    results.fetched_at = NOW
+
+    # Neither live any more nor in the results, for a day now.
+    scraper.matches = {1: match(1, 0, time.time() - 24 * 3600)}
+    scraper.check_finished([])
+    assert results.fetched_at == NOW
+
+    scraper.matches[2] = match(2, 0, time.time() - 3600)
+    scraper.check_finished([])
+    assert results.fetched_at is None
@@ -0,0 +1,80 @@
+import requests
+
+import exceptions
+import fakes
+import pages
+from fetch import HLTV_URL
+
+RESULTS_URL = f"{HLTV_URL}/results?event=2"
+
+
+def test_page_stays_changed_until_acknowledged():
+    fetcher = fakes.FakeFetcher({RESULTS_URL: pages.results(3)})
+
+    try:
+        assert fetcher.fetch(RESULTS_URL).changed
+        page = fetcher.fetch(RESULTS_URL)
+        assert page.changed
+
+        fetcher.acknowledge(page)
+        assert not fetcher.fetch(RESULTS_URL).changed
+
+    finally:
+        fetcher.close()
+
+
+def test_empty_sections_are_read_like_any_page(make_tracker):
+    event = pages.event(2, upcoming_page=pages.upcoming(8, live=0), results_page=pages.results(0), teams_page=pages.teams(9))
+
+    tracker = make_tracker(2, event, client=fakes.FakeClient(), ttls={})
+    tracker.cycle()
+
+    assert [match.state for match in tracker.scraper.matches.values()] == [1] * 8
+    assert tracker.ssmanager.sheet.get_worksheet(0).last_row() == 1 + 8
+
+    # Default TTLs: only the matches page is due again, and it is unchanged.
+    fetcher = tracker.scraper.fetcher
+    fetcher.requests.clear()
+    fetcher.pages[RESULTS_URL] = pages.results(24)
+
+    tracker.cycle()
+
+    assert fetcher.requests == [f"{HLTV_URL}/matches?event=2"]
+    assert len(tracker.scraper.matches) == 8
+
+
+def test_failed_pass_is_retried_on_the_next_update(make_tracker, monkeypatch):
+    event = pages.event(2, upcoming_page=pages.upcoming(8, live=2), results_page=pages.results(24))
+    tracker = make_tracker(2, event, ttls={})
+
+    with monkeypatch.context() as patch:
+        def fail(records):
+            raise exceptions.HLTVError("Unreadable page")
+
+        patch.setattr(tracker.scraper, "merge_matches", fail)
+        tracker.cycle()
+
+    assert tracker.scraper.matches == {}
+
+    # The results page is fetched and read again despite its TTL.
+    tracker.cycle()
+
+    states = [match.state for match in tracker.scraper.matches.values()]
+    assert (states.count(1), states.count(0), states.count(-1)) == (8, 2, 24)
+
+
+def test_cycle_survives_fetch_errors(make_tracker, monkeypatch):
+    tracker = make_tracker(2, pages.event(2))
+    fetcher = tracker.scraper.fetcher
+
+    def timeout(url, **options):
+        raise requests.ReadTimeout(f"Read timed out: {url}")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(fetcher, "get", timeout)
+        assert tracker.cycle() > 0
+
+    assert tracker.scraper.matches == {}
+
+    tracker.cycle()
+    assert len(tracker.scraper.matches) == 5 + 1 + 5
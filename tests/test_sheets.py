@@ -0,0 +1,147 @@
+import gspread
+
+import fakes
+import pages
+
+
+def sheet_reads(spreadsheet):
+    return [request for request in spreadsheet.requests if request[0] == "values_get"]
+
+
+def test_cycle_writes_every_match(make_tracker):
+    client = fakes.FakeClient()
+    tracker = make_tracker(1, pages.event(1), client=client)
+
+    tracker.cycle()
+
+    worksheet = client.open_by_key("key").get_worksheet(0)
+    ids = {int(row[0]) for row in worksheet.get_values(2, 1, None, 1)}
+
+    assert ids == set(tracker.scraper.matches)
+    assert len(ids) == 5 + 1 + 5
+
+
+def test_revision_cache_skips_reads_until_an_external_edit(make_tracker):
+    client = fakes.FakeClient()
+    tracker = make_tracker(1, pages.event(1), client=client)
+    spreadsheet = client.open_by_key("key")
+
+    tracker.cycle()
+    reads = len(sheet_reads(spreadsheet))
+
+    # The bot's own writes do not count as edits.
+    assert tracker.ssmanager.refresh() is False
+    assert len(sheet_reads(spreadsheet)) == reads
+
+    spreadsheet.get_worksheet(0).edit(2, 7, "99")
+
+    assert tracker.ssmanager.refresh() is True
+    assert len(sheet_reads(spreadsheet)) == reads + 1
+    assert tracker.ssmanager.refresh() is False
+
+
+def test_sheet_reread_after_revisions_unavailable(make_tracker):
+    client = fakes.FakeClient()
+    tracker = make_tracker(1, pages.event(1), client=client)
+    tracker.cycle()
+
+    def unavailable(id):
+        raise fakes.gspread.exceptions.APIError(fakes.FakeResponse(403, "Insufficient permission"))
+
+    client.get_file_drive_metadata = unavailable
+
+    assert tracker.ssmanager.refresh() is True
+    assert tracker.ssmanager.refresh() is True
+    assert tracker.ssmanager.revision_supported is False
+
+
+def test_cycle_survives_running_out_of_retries(make_tracker):
+    client = fakes.FakeClient()
+    tracker = make_tracker(1, pages.event(1), client=client)
+    spreadsheet = client.open_by_key("key")
+
+    spreadsheet.fail_next(100, status=503)
+    tracker.cycle()
+
+    assert tracker.full_sync is True
+    assert spreadsheet.get_worksheet(0).last_row() == 0
+
+    spreadsheet.failures = []
+    tracker.cycle()
+
+    assert tracker.full_sync is False
+    # The cells left queued are written once, not appended a second time.
+    worksheet = spreadsheet.get_worksheet(0)
+    assert sorted(int(row[0]) for row in worksheet.get_values(2, 1, None, 1)) == sorted(tracker.scraper.matches)
+
+
+def test_expired_token_logs_in_again(make_tracker):
+    client = fakes.FakeClient()
+    tracker = make_tracker(1, pages.event(1), client=client)
+
+    client.open_by_key("key").fail_next(1, status=401)
+    tracker.cycle()
+
+    assert client.http_client.logins == 1
+
+
+def test_fake_client_logs_in_like_gspread():
+    assert not hasattr(gspread.Client, "login")
+    assert callable(gspread.http_client.HTTPClient.login)
+
+    assert not hasattr(fakes.FakeClient(), "login")
+
+
+def test_failed_writes_follow_rows_moved_in_the_meantime(make_tracker):
+    client = fakes.FakeClient()
+    tracker = make_tracker(1, pages.event(1), client=client)
+    spreadsheet = client.open_by_key("key")
+    worksheet = spreadsheet.get_worksheet(0)
+
+    tracker.cycle()
+
+    # A new score, which Sheets refuses for longer than the retries last.
+    tracker.scraper.fetcher.pages[f"{pages.HLTV_URL}/results?event=1"] = pages.results(5).replace(b"<span>16</span>", b"<span>19</span>", 1)
+    spreadsheet.fail_next(100, status=503)
+    tracker.cycle()
+
+    # Meanwhile someone sorts the sheet.
+    rows = worksheet.get_values(2, 1, None, 13)
+    worksheet.set_values(2, 1, rows[::-1])
+    spreadsheet.revision += 1
+
+    spreadsheet.failures = []
+    tracker.cycle()
+
+    for row in worksheet.get_values(2, 1, None, 13):
+        match = tracker.scraper.matches[int(row[0])]
+        assert row[6] == ("" if match.teamscore1 is None else str(match.teamscore1))
+
+    assert "19" in [row[6] for row in worksheet.get_values(2, 1, None, 13)]
+
+
+def test_edit_before_a_write_is_not_taken_for_the_bots(make_tracker):
+    client = fakes.FakeClient()
+    tracker = make_tracker(1, pages.event(1), client=client)
+    worksheet = client.open_by_key("key").get_worksheet(0)
+    results_url = f"{pages.HLTV_URL}/results?event=1"
+
+    tracker.cycle()
+
+    row = next(row for row, values in enumerate(worksheet.get_values(2, 1, None, 13), 2) if values[0] == "2003")
+    update_matches = tracker.ssmanager.update_matches
+
+    def edited_first(matches):
+        # Lands after the cycle's read, before its write.
+        worksheet.edit(row, 7, "99")
+        update_matches(matches)
+
+    tracker.ssmanager.update_matches = edited_first
+    tracker.scraper.fetcher.pages[results_url] = pages.results(5).replace(b"<span>16</span>", b"<span>19</span>", 1)
+    tracker.cycle()
+
+    tracker.ssmanager.update_matches = update_matches
+    tracker.scraper.fetcher.pages[results_url] = pages.results(6).replace(b"<span>16</span>", b"<span>19</span>", 1)
+    tracker.cycle()
+
+    assert worksheet.get_values(row, 7, row, 7) == [["16"]]
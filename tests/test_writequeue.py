@@ -0,0 +1,173 @@
+import gspread
+import pytest
+
+import fakes
+from utils import coalesce_cells
+from writequeue import TokenBucket, WriteBehindQueue
+
+
+def make_queue(spreadsheet, clock, **options):
+    worksheet = spreadsheet.get_worksheet(0)
+
+    def range_name(first_row, first_col, last_row, last_col):
+        return f"'{worksheet.title}'!{gspread.utils.rowcol_to_a1(first_row, first_col)}:{gspread.utils.rowcol_to_a1(last_row, last_col)}"
+
+    bucket = options.pop("bucket", None) or TokenBucket(rate=10 ** 6, capacity=10 ** 6, clock=clock, sleep=clock.sleep)
+
+    return WriteBehindQueue(spreadsheet, range_name, bucket=bucket, sleep=clock.sleep, **options)
+
+
+def test_bucket_allows_a_burst_then_paces(clock):
+    bucket = TokenBucket(rate=60, capacity=3, clock=clock, sleep=clock.sleep)
+
+    for _ in range(3):
+        bucket.acquire()
+
+    assert clock.slept == []
+
+    for _ in range(4):
+        bucket.acquire()
+
+    # One token a second once the burst is spent.
+    assert clock.slept == pytest.approx([1.0] * 4)
+
+
+def test_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=60, capacity=2, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+    bucket.acquire()
+
+    clock.now += 600
+
+    for _ in range(2):
+        bucket.acquire()
+
+    assert clock.slept == []
+
+    bucket.acquire()
+    assert clock.slept == pytest.approx([1.0])
+
+
+def test_coalesce_rows_and_columns():
+    cells = [(2, 1, "a"), (2, 2, "b"), (3, 1, "c"), (3, 2, "d"), (5, 7, "e"), (2, 4, "f")]
+
+    assert sorted(coalesce_cells(cells)) == [
+        (2, 1, 3, 2, [["a", "b"], ["c", "d"]]),
+        (2, 4, 2, 4, [["f"]]),
+        (5, 7, 5, 7, [["e"]])
+    ]
+
+
+def test_flush_sends_one_request_of_coalesced_ranges(clock):
+    spreadsheet = fakes.FakeSpreadsheet("key")
+    queue = make_queue(spreadsheet, clock)
+
+    queue.set_row(2, ["1", "2", "3"])
+    queue.set_row(3, ["4", "5", "6"])
+    queue.set(10, 1, "x")
+
+    assert queue.flush() == 7
+    assert spreadsheet.requests == [("values_batch_update", ["'Sheet1'!A2:C3", "'Sheet1'!A10:A10"])]
+    assert spreadsheet.get_worksheet(0).get_values(2, 1, 3, 3) == [["1", "2", "3"], ["4", "5", "6"]]
+    assert len(queue) == 0
+
+
+def test_latest_value_of_a_cell_wins(clock):
+    spreadsheet = fakes.FakeSpreadsheet("key")
+    queue = make_queue(spreadsheet, clock)
+
+    queue.set(2, 1, "old")
+    queue.set(2, 1, "new")
+    queue.set(2, 2, None)
+
+    assert queue.flush() == 1
+    assert spreadsheet.get_worksheet(0).get_values(2, 1, 2, 1) == [["new"]]
+
+
+def test_retries_server_errors(clock):
+    spreadsheet = fakes.FakeSpreadsheet("key")
+    queue = make_queue(spreadsheet, clock, max_retries=3)
+    spreadsheet.fail_next(2, status=503)
+
+    queue.set(2, 1, "a")
+
+    assert queue.flush() == 1
+    assert queue.retries == 2
+    assert len(clock.slept) == 2
+
+
+def test_failed_flush_requeues_cells(clock):
+    spreadsheet = fakes.FakeSpreadsheet("key")
+    queue = make_queue(spreadsheet, clock, max_retries=2)
+    spreadsheet.fail_next(3, status=503)
+
+    queue.set_row(2, ["a", "b"])
+
+    with pytest.raises(gspread.exceptions.APIError):
+        queue.flush()
+
+    assert queue.pending == {(2, 1): "a", (2, 2): "b"}
+
+    # Written again while queued: the newer value is kept.
+    queue.set(2, 2, "c")
+
+    assert queue.flush() == 2
+    assert spreadsheet.get_worksheet(0).get_values(2, 1, 2, 2) == [["a", "c"]]
+
+
+def test_requests_are_split_and_only_unsent_cells_requeued(clock):
+    spreadsheet = fakes.FakeSpreadsheet("key")
+    queue = make_queue(spreadsheet, clock, max_retries=0, max_cells=2)
+
+    for row in range(2, 6):
+        queue.set(row * 2, 1, row)
+
+    original = spreadsheet.values_batch_update
+    calls = []
+
+    def fail_second(body=None):
+        calls.append(body)
+        if len(calls) == 2:
+            raise gspread.exceptions.APIError(fakes.FakeResponse(500, "Backend error"))
+
+        return original(body=body)
+
+    spreadsheet.values_batch_update = fail_second
+
+    with pytest.raises(gspread.exceptions.APIError):
+        queue.flush()
+
+    assert queue.pending == {(8, 1): 4, (10, 1): 5}
+
+    spreadsheet.values_batch_update = original
+    assert queue.flush() == 2
+
+
+def test_no_cells_lost_under_write_quota(clock):
+    spreadsheet = fakes.FakeSpreadsheet("key", write_quota=2, clock=clock)
+    queue = make_queue(spreadsheet, clock, max_retries=8, max_cells=5)
+
+    # Every other row and column, so nothing coalesces and a flush takes
+    # several requests.
+    expected = {}
+    for row in range(2, 42, 2):
+        for col in range(1, 6, 2):
+            expected[(row, col)] = f"{row}:{col}"
+            queue.set(row, col, expected[(row, col)])
+
+    written = 0
+    while len(queue):
+        written += queue.flush()
+
+    assert written == len(expected)
+    assert spreadsheet.rejected > 0
+
+    values = spreadsheet.get_worksheet(0).get_values(1, 1, 41, 5)
+    assert {(row, col): values[row - 1][col - 1] for row, col in expected} == expected
+
+
+def test_fake_errors_carry_a_json_body():
+    err = gspread.exceptions.APIError(fakes.FakeResponse(429, "Quota exceeded"))
+
+    assert err.code == 429
+    assert fakes.FakeResponse(429, "Quota exceeded").json()["error"]["message"] == "Quota exceeded"
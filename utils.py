@@ -20,7 +20,8 @@ def get_credentials(args):
 
     # If modifying these scopes, delete your previously saved credentials
     # at ~/.credentials/sheets.googleapis.com-python-quickstart.json
-    SCOPES = 'https://www.googleapis.com/auth/spreadsheets'
+    # drive.metadata.readonly lets Sheets check the spreadsheet revision
+    SCOPES = 'https://www.googleapis.com/auth/spreadsheets https://www.googleapis.com/auth/drive.metadata.readonly'
     CLIENT_SECRET_FILE = 'secrets/client_secret.json'
     APPLICATION_NAME = 'CLI'
 
@@ -100,11 +101,51 @@ def tryconvert(value, default=-1):
         return(default)
 
 
-def range_to_file(ws_range, filename="range.txt"):
-    if os.path.isfile(filename):
-        os.remove(filename)
+def coalesce_cells(cells):
+    """Merges (row, col, value) triples into as few rectangular blocks as
+    possible: contiguous columns within a row first, then identical column
+    spans on consecutive rows.
+
+    Returns:
+        List of (first_row, first_col, last_row, last_col, values) tuples.
+    """
+    rows = {}
+    for row, col, value in cells:
+        rows.setdefault(row, {})[col] = value
+
+    blocks = []
+    open_blocks = {}
+    for row in sorted(rows.keys()):
+        columns = rows[row]
+
+        runs = []
+        for col in sorted(columns.keys()):
+            if runs and runs[-1][1] == col - 1:
+                runs[-1][1] = col
+                runs[-1][2].append(columns[col])
+            else:
+                runs.append([col, col, [columns[col]]])
+
+        still_open = {}
+        for first_col, last_col, values in runs:
+            block = open_blocks.get((first_col, last_col))
 
-    with open(filename, "a+") as file:
+            if block is not None and block[2] == row - 1:
+                block[2] = row
+                block[4].append(values)
+            else:
+                block = [row, first_col, row, last_col, [values]]
+                blocks.append(block)
+
+            still_open[(first_col, last_col)] = block
+
+        open_blocks = still_open
+
+    return [tuple(block) for block in blocks]
+
+
+def range_to_file(ws_range, filename="range.txt"):
+    with open(filename, "w") as file:
         if isinstance(ws_range, dict):
             for index in ws_range.keys():
                 file.write(f"{index}: {repr(ws_range[index])}\r\n")
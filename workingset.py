@@ -0,0 +1,46 @@
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class WorkingSet:
+    """Keeps Scraper.matches down to upcoming, live and recently finished
+    matches. Anything older stays in SQLite and is loaded back on demand by
+    Scraper.merge_matches when it shows up on a page again.
+    """
+
+    def __init__(self, scraper, database, retention=2 * 24 * 3600):
+        self.scraper = scraper
+        self.database = database
+        self.retention = retention
+
+    def horizon(self, now=None):
+        if now is None:
+            now = time.time()
+
+        return now - self.retention
+
+    def load(self):
+        self.database.get_matches(self.scraper, since=self.horizon())
+        self.database.get_teams(self.scraper)
+        self.database.get_definitions(self.scraper)
+        self.database.get_fingerprints(self.scraper)
+
+        log.info(f"Loaded {len(self.scraper.matches)} active matches and {len(self.scraper.teams)} teams")
+
+    def evict(self, keep=(), now=None):
+        horizon = self.horizon(now)
+
+        expired = [
+            match_id for match_id, match in self.scraper.matches.items()
+            if match.state == -1 and match.unix_ts is not None and match.unix_ts < horizon and match_id not in keep
+        ]
+
+        for match_id in expired:
+            del self.scraper.matches[match_id]
+
+        if expired:
+            log.debug(f"Evicted {len(expired)} finished matches from memory")
+
+        return len(expired)
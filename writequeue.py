@@ -0,0 +1,184 @@
+import logging
+import random
+import threading
+import time
+
+import gspread
+
+import metrics
+from utils import coalesce_cells
+
+log = logging.getLogger(__name__)
+
+# Google returns these for quota exhaustion and transient backend failures.
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """Allows `rate` requests per minute on average with bursts up to `capacity`."""
+
+    def __init__(self, rate=60, capacity=5, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+
+        self.tokens = capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate / 60)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self.refill()
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) * 60 / self.rate
+
+            self.sleep(wait)
+
+
+class WriteBehindQueue:
+    """Pending cell writes for one worksheet.
+
+    Writing the same cell twice before a flush keeps only the latest value.
+    A flush sends everything as coalesced ranges, paced by a token bucket,
+    and retries quota and server errors with exponential backoff. Cells that
+    still could not be written stay queued for the next flush.
+    """
+
+    def __init__(self, spreadsheet, range_name, bucket=None, max_retries=5, backoff=1.0, max_backoff=64, max_cells=10000, sleep=time.sleep, labels=None):
+        self.spreadsheet = spreadsheet
+        self.labels = labels or {}  # metric labels
+        self.range_name = range_name  # (first_row, first_col, last_row, last_col) -> A1 range
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_cells = max_cells
+        self.sleep = sleep
+
+        if bucket is None:
+            bucket = TokenBucket(sleep=sleep)
+
+        self.bucket = bucket
+
+        self.pending = {}  # (row, col) -> value
+        self.lock = threading.Lock()
+
+        self.retries = 0
+        self.requests = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def set(self, row, col, value):
+        if value is None:
+            return
+
+        with self.lock:
+            self.pending[(row, col)] = value
+
+    def set_row(self, row, values, first_col=1):
+        with self.lock:
+            for offset, value in enumerate(values):
+                if value is not None:
+                    self.pending[(row, first_col + offset)] = value
+
+    def clear(self):
+        """Drops every pending cell. Returns how many there were."""
+        with self.lock:
+            dropped, self.pending = len(self.pending), {}
+
+        return dropped
+
+    def requeue(self, cells):
+        # Anything written again in the meantime is newer and wins.
+        with self.lock:
+            for key, value in cells.items():
+                self.pending.setdefault(key, value)
+
+    def split(self, blocks):
+        request, size = [], 0
+
+        for block in blocks:
+            cells = (block[2] - block[0] + 1) * (block[3] - block[1] + 1)
+
+            if request and size + cells > self.max_cells:
+                yield request
+                request, size = [], 0
+
+            request.append(block)
+            size += cells
+
+        if request:
+            yield request
+
+    def send(self, blocks):
+        delay = self.backoff
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+
+            try:
+                self.requests += 1
+                metrics.SHEET_REQUESTS.inc(request="values_batch_update", **self.labels)
+
+                with metrics.PHASE_SECONDS.time(phase="sheets_write", **self.labels):
+                    self.spreadsheet.values_batch_update(body={
+                        'valueInputOption': 'USER_ENTERED',
+                        'data': [{'range': self.range_name(*block[:4]), 'values': block[4]} for block in blocks]
+                    })
+
+                return
+
+            except gspread.exceptions.APIError as err:
+                status = getattr(err.response, "status_code", None)
+
+                if status not in RETRY_STATUS or attempt == self.max_retries:
+                    raise
+
+                self.retries += 1
+                metrics.RETRIES.inc(status=status, **self.labels)
+                wait = min(delay, self.max_backoff) * (1 + random.random() / 2)
+                log.warning(f"Sheets returned {status}, retrying in {wait:.1f}s ({attempt + 1}/{self.max_retries})")
+
+                self.sleep(wait)
+                delay *= 2
+
+    def flush(self):
+        """Writes all pending cells. Returns the number of cells written."""
+        with self.lock:
+            cells, self.pending = self.pending, {}
+
+        if not cells:
+            return 0
+
+        blocks = coalesce_cells((row, col, value) for (row, col), value in cells.items())
+
+        written = 0
+        try:
+            for request in self.split(blocks):
+                self.send(request)
+
+                for block in request:
+                    for offset, values in enumerate(block[4]):
+                        for col_offset in range(len(values)):
+                            cells.pop((block[0] + offset, block[1] + col_offset), None)
+                            written += 1
+
+        finally:
+            metrics.CELLS_WRITTEN.inc(written, **self.labels)
+
+            if cells:
+                log.warning(f"{len(cells)} cells left queued after a failed write")
+                self.requeue(cells)
+
+        return written